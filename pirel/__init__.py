@@ -1,3 +1,5 @@
+__version__='0.2'
+
 import pirel.tools
 import pirel.pcells
 import pirel.modifiers
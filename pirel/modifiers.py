@@ -14,7 +14,7 @@ from pirel.tools import LayoutDefault as ld
 
 from phidl.device_layout import Port,CellArray,Device,DeviceReference,Group
 
-from pirel.tools import Point,LayoutParamInterface,LayoutPart
+from pirel.tools import Point,LayoutParamInterface,LayoutPart,draw_array
 
 import pirel.addOns.standard_parts as ps
 
@@ -28,6 +28,7 @@ from copy import copy,deepcopy
 
 # Classes decorators
 
+@pt.modifier
 def makeScaled(cls):
 
     ''' Class Decorator that accept normalized parameters for resonator designs.
@@ -137,6 +138,7 @@ def makeScaled(cls):
 
     return Scaled
 
+@pt.modifier
 def addPad(cls, pad=pc.Pad, side='top'):
     ''' Class decorator to add probing pads to existing cells.
         Parameters
@@ -221,6 +223,7 @@ def addPad(cls, pad=pc.Pad, side='top'):
 
     return Padded
 
+@pt.modifier
 def addPartialEtch(cls):
 
     class PartialEtched(cls):
@@ -250,6 +253,7 @@ def addPartialEtch(cls):
 
     adddPartialEtch.__name__=cls.__name__+' w PartialEtching'
 
+@pt.modifier
 def addLargeGround(probe):
 
     ''' legacy decorator to make large ground pads'''
@@ -334,6 +338,7 @@ def addLargeGround(probe):
 
     return LargeGrounded
 
+@pt.modifier
 def makeArray(cls,n=2):
     '''class decorator to make arrays of identical pcells.
 
@@ -458,6 +463,7 @@ def makeArray(cls,n=2):
 
     return Arrayed
 
+@pt.modifier
 def addPassivation(cls,
     margin=ld.PassivationMargin,
     scale=ld.PassivationScale,
@@ -532,6 +538,7 @@ def addPassivation(cls,
 
     return Passivated
 
+@pt.modifier
 def makeFixture(cls,style='open'):
 
     class Fixture(cls):
@@ -604,6 +611,7 @@ def makeFixture(cls,style='open'):
 
     return Fixture
 
+@pt.modifier
 def makeTwoPortProbe(cls):
 
     class TwoPort(cls):
@@ -682,6 +690,7 @@ def makeTwoPortProbe(cls):
 
     return TwoPort
 
+@pt.modifier
 def addOnePortProbe(cls,probe=pc.GSGProbe):
     ''' adds a one port probe to existing LayoutClass.
 
@@ -738,31 +747,16 @@ def addOnePortProbe(cls,probe=pc.GSGProbe):
 
             self._setup_signal_routing(cell)
 
-            cell.absorb(cell<<self._draw_signal_routing())
+            sig_routing_cell=self._draw_signal_routing()
 
-            try:
-
-                self._setup_ground_routing(
-                    cell,
-                    'straight')
-
-                routing_cell=self._draw_ground_routing()
-
-            except:
-
-                self._setup_ground_routing(
-                    cell,
-                    'side')
-
-                try:
-
-                    routing_cell=self._draw_ground_routing()
-
-                except:
+            cell.absorb(cell<<sig_routing_cell)
 
-                    import pdb; pdb.set_trace()
+            self._setup_ground_routing(
+                cell,
+                'straight',
+                obstacles=(sig_routing_cell.bbox,))
 
-                    self._draw_ground_routing()
+            routing_cell=self._draw_ground_routing()
 
             _add_default_ground_vias(self,routing_cell)
 
@@ -844,8 +838,8 @@ def addOnePortProbe(cls,probe=pc.GSGProbe):
                 supercomp.update({
                     "Probe":probe,
                     "SigTrace":pc.Routing,
-                    "GndLeftTrace":pc.Routing,
-                    "GndRightTrace":pc.Routing,
+                    "GndLeftTrace":pc.MultiRouting,
+                    "GndRightTrace":pc.MultiRouting,
                     "GndVia":pc.Via})
 
             else:
@@ -913,7 +907,7 @@ def addOnePortProbe(cls,probe=pc.GSGProbe):
                     destination=bottom_ports[0],
                     overlap=-self.probe_dut_distance.y)
 
-        def _setup_ground_routing(self,cell,label):
+        def _setup_ground_routing(self,cell,label,obstacles=()):
 
             device_ref=cell["Device"]
 
@@ -933,9 +927,11 @@ def addOnePortProbe(cls,probe=pc.GSGProbe):
 
                     groundroute.trace_width=self.gnd_routing_width
 
-                    if index==0:
+                    groundroute.obstacles=obstacles
 
-                        groundroute.side='left'
+                    groundroute.spacing=self.gnd_routing_width/2
+
+                    if index==0:
 
                         if label=='straight':
 
@@ -947,8 +943,6 @@ def addOnePortProbe(cls,probe=pc.GSGProbe):
 
                     elif index==1:
 
-                        groundroute.side='right'
-
                         if label=='straight':
 
                             groundroute.source=(probe_ref.ports['GroundRXN'],)
@@ -979,7 +973,7 @@ def addOnePortProbe(cls,probe=pc.GSGProbe):
 
                 routing_cell.absorb(routing_cell<<self.gndrighttrace.draw())
 
-                return st.join(routing_cell)
+                return routing_cell
 
             else :
 
@@ -1031,6 +1025,7 @@ def addOnePortProbe(cls,probe=pc.GSGProbe):
 
     return OnePortProbed
 
+@pt.modifier
 def addTwoPortProbe(cls,probe=makeTwoPortProbe(pc.GSGProbe)):
 
     class TwoPortProbed(addOnePortProbe(cls,probe)):
@@ -1356,6 +1351,7 @@ def addTwoPortProbe(cls,probe=makeTwoPortProbe(pc.GSGProbe)):
 
     return TwoPortProbed
 
+@pt.modifier
 def addGroundVias(cls):
 
     class withGroundVia(cls):
@@ -1379,6 +1375,7 @@ def addGroundVias(cls):
 
     return withGroundVia
 
+@pt.modifier
 def connectPorts(cls,tags,layer):
 
     if isinstance(tags,str):
@@ -1534,7 +1531,7 @@ def add_pads(cell,pad,tag='top',exact=False):
 
     cell.add_ref(pad_cell,alias="Pad")
 
-def add_vias(cell : Device, bbox, via : pt.LayoutPart, spacing : float = 0,tolerance: float = 0):
+def add_vias(cell : Device, bbox, via : pt.LayoutPart, spacing : float = 0,tolerance: float = 0,layers=None):
 
     ''' adds via pattern to cell with constraints.
 
@@ -1554,6 +1551,9 @@ def add_vias(cell : Device, bbox, via : pt.LayoutPart, spacing : float = 0,toler
     tolerance : float (default 0)
         if not 0, used to determine via distance from target object border
 
+    layers : int, tuple or set (optional)
+        layers of cell where vias can be placed, all if None.
+
     Returns:
     --------
     cell_out : Device
@@ -1569,26 +1569,33 @@ def add_vias(cell : Device, bbox, via : pt.LayoutPart, spacing : float = 0,toler
 
         return
 
-    via_cell=draw_array(via.draw(),
-        nvias_x,nvias_y,
-        row_spacing=spacing,
-        column_spacing=spacing)
+    via_device=via.draw()
 
-    via_cell.move(
-        origin=(via_cell.x,via_cell.y),
-        destination=(bbox_cell.x,bbox_cell.y))
+    via_size=Point(via_device.size)+Point(spacing,spacing)
 
-    tbr=[]
+    origin=Point(bbox_cell.center)-Point(via_device.center)-\
+        Point(via_size.x*(nvias_x-1),via_size.y*(nvias_y-1))*0.5
 
-    for elem in via_cell.references:
+    i,j=np.meshgrid(np.arange(nvias_x),np.arange(nvias_y),indexing='ij')
 
-        if not st.is_cell_inside(elem,cell,tolerance):
+    offsets=np.column_stack((i.ravel()*via_size.x,j.ravel()*via_size.y))+origin.coord
 
-            tbr.append(elem)
+    boxes=np.tile(offsets,2)+np.ravel(via_device.bbox)
 
-    via_cell.remove(tbr)
+    mask=st.are_boxes_inside(boxes,cell,tolerance,layers).reshape(nvias_x,nvias_y)
 
-    cell.absorb(cell.add_ref(via_cell,alias="Vias"))
+    if not mask.any():
+
+        return
+
+    via_cell=draw_array(via_device,
+        nvias_x,nvias_y,
+        row_spacing=spacing,
+        column_spacing=spacing,
+        aref=True,
+        mask=mask)
+
+    cell.add_ref(via_cell,alias="Vias").move(destination=origin.coord)
 
     # return cell_out
 
@@ -1635,82 +1642,20 @@ def _add_default_ground_vias(self,cell):
     # return
     if hasattr(self,'gndvia'):
 
-        add_vias(cell,
-            cell.bbox,
-            self.gndvia,
-            spacing=self.gndvia.size*1.25,
-            tolerance=self.gndvia.size/2)
+        if hasattr(self,'probe'):
 
-def draw_array(
-    cell : Device,
-    x : int, y : int,
-    row_spacing : float = 0 ,
-    column_spacing : float = 0 ) -> Device:
-    ''' returns a spaced matrix of identical cells, including ports in the output cell.
+            layers=self.probe.ground_layer
 
-    Parameters
-    ----------
-    cell : phidl.Device
-
-    x : int
-        columns of copies
-
-    y : int
-        rows of copies
-
-    row_spacing: float
-
-    column_spacing: float
-
-    Returns
-    -------
-    cell : phidl.Device.
-    '''
-
-    new_cell=pg.Device(cell.name+"array")
-
-    cell_size=Point(cell.size)+Point(column_spacing,row_spacing)
+        else:
 
-    for j in range(y):
+            layers=set(self.gndvia.conn_layer)
 
-        for i in range(x):
-
-            if y==1 and x==1:
-
-                ref=new_cell.add_ref(cell,alias=cell.name)
-
-            elif y==1:
-
-                ref=new_cell.add_ref(cell,alias=cell.name+'_'+str(i))
-
-            elif x==1:
-
-                ref=new_cell.add_ref(cell,alias=cell.name+'_'+str(j))
-
-            else:
-
-                ref=new_cell.add_ref(cell,alias=cell.name+'_'+str(i)+'_'+str(j))
-
-            ref.move(
-                destination=(Point(cell_size.x*i,cell_size.y*j)).coord)
-
-            if y==1 and x==1:
-
-                ppt.copy_ports(ref,new_cell)
-
-            elif y==1:
-
-                ppt.copy_ports(ref,new_cell,suffix='_'+str(i))
-
-            elif x==1:
-
-                ppt.copy_ports(ref,new_cell,suffix='_'+str(j))
-
-            else:
-
-                ppt.copy_ports(ref,new_cell,suffix='_'+str(i)+'_'+str(j))
-
-    return new_cell
+        add_vias(cell,
+            cell.bbox,
+            self.gndvia,
+            spacing=self.gndvia.size*1.25,
+            tolerance=self.gndvia.size/2,
+            layers=layers)
 
 #
 # _allmodifiers=(
@@ -6,6 +6,8 @@ import pirel.sketch_tools as st
 
 import pirel.port_tools as ppt
 
+import pirel.rect_tools as rt
+
 from phidl.device_layout import Device, Port, DeviceReference, Group,Path
 
 import phidl.geometry as pg
@@ -194,14 +196,8 @@ class IDTSingle(PartWithLayer) :
 
         unitcell=self._draw_unit_cell()
 
-        cell=Device(self.name)
-
-        cell.name=self.name
-
-        cell.add_array(unitcell,columns=self.n,rows=1,\
-            spacing=(self.pitch,0))
-
-        cell.flatten()
+        cell=rt.RectSet.from_device(unitcell).array(
+            columns=self.n,rows=1,spacing=(self.pitch,0)).to_device(self.name)
 
         r=st.get_corners(cell)
 
@@ -345,14 +341,8 @@ class IDT(PartWithLayer) :
 
         unitcell=self._draw_unit_cell()
 
-        cell=Device(self.name)
-
-        cell.name=self.name
-
-        cell.add_array(unitcell,columns=self.n,rows=1,\
-            spacing=(self.pitch*2,0))
-
-        cell.flatten()
+        cell=rt.RectSet.from_device(unitcell).array(
+            columns=self.n,rows=1,spacing=(self.pitch*2,0)).to_device(self.name)
 
         totx=self.pitch*(self.n*2+1)-self.pitch*(1-self.coverage)
 
@@ -361,10 +351,6 @@ class IDT(PartWithLayer) :
         finger_dist=pt.Point(self.pitch*1,\
         self.length+self.y_offset)
 
-        cell=st.join(cell)
-
-        cell.name=self.name
-
         cell.add_port(
             Port(name='bottom',
             midpoint=(
@@ -944,10 +930,10 @@ class Via(PartWithLayer):
         via shape.
     '''
 
-    size=LayoutParamInterface()
-
     shape=LayoutParamInterface(allowed_values={'square','circle'})
 
+    size=LayoutParamInterface()
+
     def __init__(self,*args,**kwargs):
 
         super().__init__(*args,**kwargs)
@@ -999,14 +985,14 @@ class Probe(LayoutPart):
         ground layer.
     '''
 
-    pitch=LayoutParamInterface()
-
-    size=LayoutParamInterface()
-
     sig_layer=LayoutParamInterface()
 
     ground_layer=LayoutParamInterface()
 
+    pitch=LayoutParamInterface()
+
+    size=LayoutParamInterface()
+
     def __init__(self,*args,**kwargs):
 
         super().__init__(*args,**kwargs)
@@ -1506,6 +1492,7 @@ class TwoDMR(LayoutPart):
 
         return {'IDT':IDTSingle,"Bus":Bus,"EtchPit":EtchPit,"Anchor":MultiAnchor}
 
+@pt.modifier
 def addBottomPlate(cls):
 
     class BottomPlated(cls):
@@ -1657,10 +1644,10 @@ class SMD(PartWithLayer):
     distance :pt.Point.
     '''
 
-    size=LayoutParamInterface()
-
     distance=LayoutParamInterface()
 
+    size=LayoutParamInterface()
+
     def __init__(self,*a,**kw):
 
         super().__init__(*a,**kw)
@@ -1726,8 +1713,6 @@ class Routing(PartWithLayer):
 
     clearance=LayoutParamInterface()
 
-    overhang=LayoutParamInterface()
-
     type=LayoutParamInterface(
         allowed_values={'manhattan','L','U','J','C','V','Z','straight'})
 
@@ -1735,6 +1720,8 @@ class Routing(PartWithLayer):
 
     destination=LayoutParamInterface()
 
+    overhang=LayoutParamInterface()
+
     trace_width=LayoutParamInterface()
 
     side=LayoutParamInterface(allowed_values={'auto','left','right'})
@@ -1788,15 +1775,53 @@ class Routing(PartWithLayer):
 
         self._check_if_ports_in_clearance(s,d)
 
-        try:
+        key=self._get_path_key(s,d)
 
-            p=self._draw_non_hindered_path(s,d)
+        points=_routing_cache.get(key)
 
-        except ValueError as e_non_hind:
+        if points is None:
 
-            p=self._draw_hindered_path(s,d,self.side)
+            points=tuple(map(tuple,self._find_path(s,d).points.tolist()))
 
-        return p
+            _routing_cache.put(key,points)
+
+        return Path(points)
+
+    def _get_path_key(self,s,d):
+        ''' Hashable summary of everything _find_path(s,d) depends on.'''
+
+        def _port_key(port):
+
+            return (pt.Point(port.midpoint).coord,round(port.width,6),round(port.orientation%360,6))
+
+        return (
+            self.__class__,
+            _port_key(s),
+            _port_key(d),
+            tuple(pt.Point(x).coord for x in self.clearance),
+            self.trace_width,
+            self.overhang,
+            self.side,
+            self._get_max_width())
+
+    def _find_path(self,s,d):
+        ''' Returns the first candidate path that is not hindered.
+
+        Non hindered candidates are tried first, then hindered ones
+        from the shortest. Only the tried candidates are extruded.
+        '''
+
+        hindered=sorted(self._get_hindered_candidates(s,d,self.side),key=_get_points_length)
+
+        for points in (*self._get_non_hindered_candidates(s,d),*hindered):
+
+            p=Path(tuple([x.coord for x in points]))
+
+            if not self._is_hindered(p,s,d):
+
+                return p
+
+        raise ValueError("hindered path is impossible")
 
     def _check_if_ports_in_clearance(self,s,d):
 
@@ -1817,42 +1842,34 @@ class Routing(PartWithLayer):
 
         return cell_frame
 
-    def _draw_non_hindered_path(self,s,d):
+    def _get_non_hindered_candidates(self,s,d):
 
         p1,p1_proj,p2_proj,p2=self._calculate_start_end_connection_points(s,d)
 
+        candidates=[]
+
         for p_mid in (pt.Point(p1_proj.x,p2_proj.y),pt.Point(p2_proj.x,p1_proj.y)):
 
             points=[p1,p1_proj,p_mid,p2_proj,p2]
 
             pt._remove_duplicates(points)
 
-            points=pt._remove_backward_points(points)
-
-            p=Path(tuple([x.coord for x in points]))
+            candidates.append(pt._remove_backward_points(points))
 
-            if not self._is_hindered(p,s,d):
+        return candidates
 
-                return p
+    def _get_hindered_candidates(self,s,d,side='auto'):
 
-        raise ValueError("non-hindered path is impossible")
+        if side=='auto':
 
-    def _draw_hindered_path(self,s,d,side='auto'):
+            return [
+                *self._get_hindered_candidates(s,d,'left'),
+                *self._get_hindered_candidates(s,d,'right')]
 
         r=st.get_corners(pg.bbox(self.clearance))
 
         extra_width=self._get_max_width()
 
-        if side=='auto':
-
-            path1=self._draw_hindered_path(s,d,'left')
-
-            path2=self._draw_hindered_path(s,d,'right')
-
-            if path2.length()<path1.length() : return path2
-
-            else : return path1
-
         p1,p1_proj,p2_proj,p2=self._calculate_start_end_connection_points(s,d)
 
         if side=='left':
@@ -1875,36 +1892,129 @@ class Routing(PartWithLayer):
 
             p_mid2=p_above_clearance
 
+        candidates=[]
+
         for p_mid3 in (pt.Point(p_mid2.x,p2_proj.y),pt.Point(p2_proj.x,p_mid2.y)):
 
             points=[p1,p1_proj,p_below_clearance,p_mid2,p_mid3,p2_proj,p2]
 
             pt._remove_duplicates(points)
 
-            points=pt._remove_backward_points(points)
+            candidates.append(pt._remove_backward_points(points))
 
-            p=Path(tuple([x.coord for x in points]))
+        return candidates
 
-            if not self._is_hindered(p,s,d):
+    def _is_hindered(self,p,s,d):
 
-                return p
+        if self.clearance==((0,0),(0,0)):
 
-        raise ValueError("hindered path is impossible")
+            return False
 
-    def _is_hindered(self,p,s,d):
+        hindered=self._is_hindered_manhattan(p,s,d)
+
+        if hindered is not None:
+
+            return hindered
 
         test_path_cell=self._draw_path_cell(p,s,d)
 
-        if self.clearance==((0,0),(0,0)):
+        return not st.is_cell_outside(
+            pg.union(test_path_cell),
+            pg.bbox(self.clearance),
+            tolerance=0)
+
+    def _is_hindered_manhattan(self,p,s,d):
+        ''' Analytic version of _is_hindered for rectilinear, constant width paths.
+
+        Returns None when the answer cannot be given without boolean operations.
+        '''
+
+        if self.trace_width is None:
+
+            if not s.width==d.width:
+
+                return None
+
+            width=s.width
+
+        else:
+
+            width=self.trace_width
+
+        rects=self._get_trace_rectangles(p.points,width)
+
+        if rects is None:
+
+            return None
+
+        (x0,y0),(x1,y1)=self.clearance
+
+        dx=np.minimum(rects[:,2],max(x0,x1))-np.maximum(rects[:,0],min(x0,x1))
+
+        dy=np.minimum(rects[:,3],max(y0,y1))-np.maximum(rects[:,1],min(y0,y1))
+
+        overlaps=np.clip(dx,0,None)*np.clip(dy,0,None)
+
+        if overlaps.sum()<5e-4:
 
             return False
 
+        elif overlaps.max()>2e-3:
+
+            return True
+
         else:
 
-            return not st.is_cell_outside(
-                pg.union(test_path_cell),
-                pg.bbox(self.clearance,layer=self.layer),
-                tolerance=0)
+            return None
+
+    @staticmethod
+    def _get_trace_rectangles(points,width):
+        ''' Rectangles (x0,y0,x1,y1) whose union is a manhattan path extruded by width.
+
+        Segments are extended by width/2 at interior vertices, matching the
+        mitered corners of Path.extrude.
+        Returns None if points are not a rectilinear path.
+        '''
+
+        points=np.round(np.asarray(points,dtype=float),6)
+
+        if len(points)<2:
+
+            return None
+
+        start,end=points[:-1],points[1:]
+
+        horizontal=start[:,1]==end[:,1]
+
+        vertical=start[:,0]==end[:,0]
+
+        if not np.all(horizontal^vertical):
+
+            return None
+
+        ext=np.full((len(start),2),width/2)
+
+        ext[0,0]=0
+
+        ext[-1,1]=0
+
+        lo=np.minimum(start,end)
+
+        hi=np.maximum(start,end)
+
+        forward=np.where(horizontal,end[:,0]>start[:,0],end[:,1]>start[:,1])
+
+        ext_lo=np.where(forward,ext[:,0],ext[:,1])
+
+        ext_hi=np.where(forward,ext[:,1],ext[:,0])
+
+        half=np.full(len(start),width/2)
+
+        return np.column_stack((
+            np.where(horizontal,lo[:,0]-ext_lo,lo[:,0]-half),
+            np.where(horizontal,lo[:,1]-half,lo[:,1]-ext_lo),
+            np.where(horizontal,hi[:,0]+ext_hi,hi[:,0]+half),
+            np.where(horizontal,hi[:,1]+half,hi[:,1]+ext_hi)))
 
     def _draw_path_cell(self,p,s,d):
 
@@ -1977,11 +2087,548 @@ class Routing(PartWithLayer):
 
         return width
 
-_allclasses=(Text,Rect,IDTSingle,IDT,PartialEtchIDT,Bus,EtchPit,Anchor,MultiAnchor,Via,Routing,GSProbe,GSGProbe,
-Pad,ViaInPad,LFERes,TwoDMR,TFERes)
+_routing_cache=pt._register_cache(pt._LRUCache(maxsize=4096))
+
+def _get_points_length(points):
+
+    return sum(abs(p1-p0) for p0,p1 in zip(points,points[1:]))
+
+class GridRouting(Routing):
+    ''' Generate routing connection on a sparse manhattan grid.
+
+    The shortest path (with a penalty on bends) that keeps the trace outside
+    clearance and all obstacles is found with an A* search.
+
+    Attributes
+    ----------
+    obstacles : iterable
+        each obstacle is a bbox, a polygon or anything with a bbox
+        (e.g. phidl.Device). Polygons are approximated with their bbox.
+
+    spacing : float
+        minimum distance between trace and obstacles,
+        except for the straight traces leaving source and reaching destination.
+        If no route honours it, the trace is only kept from overlapping obstacles.
+
+    overhang : float
+        length of the straight traces leaving source and reaching destination.
+        if None, they are as short as spacing allows, and ports too close
+        to an obstacle ahead are left sideways.
+    '''
+
+    obstacles=LayoutParamInterface()
+
+    spacing=LayoutParamInterface()
+
+    _moves=((1,0),(-1,0),(0,1),(0,-1))
+
+    _shared_cost=0.5
+
+    def __init__(self,*args,**kwargs):
+
+        super().__init__(*args,**kwargs)
+        self.obstacles=ld.GridRoutingobstacles
+        self.spacing=ld.GridRoutingspacing
+
+    def _make_path(self,s,d,shared=()):
+
+        self._check_if_ports_in_clearance(s,d)
+
+        try:
+
+            return self._route(s,d,shared,self.spacing)
+
+        except ValueError:
+
+            if not self.spacing:
+
+                raise
+
+            # ports too close to the obstacles to honour spacing
+
+            return self._route(s,d,shared,0)
+
+    def _route(self,s,d,shared,spacing):
+
+        width=self._get_trace_width(s,d)
+
+        boxes=self._get_obstacle_boxes()
+
+        grown=boxes+np.array([-1,-1,1,1])*(spacing+width/2)
+
+        if self.overhang is None:
+
+            p1,(start,start_dir)=pt.Point(s.midpoint),self._get_exit(s,grown,boxes,width)
+
+            p2,(end,end_dir)=pt.Point(d.midpoint),self._get_exit(d,grown,boxes,width)
+
+            p1_proj,p2_proj,end_dir=start.pop(),end.pop(),end_dir^1
+
+        else:
+
+            start_dir=self._get_direction(s)
+
+            end_dir=self._get_direction(d)^1
+
+            p1,p1_proj,p2_proj,p2=self._calculate_start_end_connection_points(s,d)
+
+            start,end=[],[]
+
+        points=[p1,*start,*self._search_grid(
+            p1_proj,p2_proj,start_dir,end_dir,grown,
+            bend_penalty=width,
+            strict_start=p1_proj==p1,
+            strict_end=p2_proj==p2,
+            shared=shared,
+            margin=width),*end[::-1],p2]
+
+        pt._remove_duplicates(points)
+
+        points=_remove_collinear_points(points)
+
+        p=Path(tuple([x.coord for x in points]))
+
+        if self._is_blocked(p.points,width,boxes):
+
+            raise ValueError("grid routing is impossible")
+
+        return p
+
+    def _get_trace_width(self,s,d):
+
+        if self.trace_width is None:
+
+            return max(s.width,d.width)
+
+        return self.trace_width
+
+    def _get_obstacle_boxes(self):
+        ''' Returns obstacles and clearance as a (N,4) array of x0,y0,x1,y1.'''
+
+        obstacles=[*self.obstacles]
+
+        if not self.clearance==((0,0),(0,0)):
+
+            obstacles.append(self.clearance)
+
+        boxes=np.empty((len(obstacles),4))
+
+        for index,obstacle in enumerate(obstacles):
+
+            if hasattr(obstacle,'bbox'):
+
+                obstacle=obstacle.bbox
+
+            obstacle=np.asarray(obstacle,dtype=float).reshape(-1,2)
+
+            boxes[index]=(*obstacle.min(axis=0),*obstacle.max(axis=0))
+
+        return boxes
+
+    @classmethod
+    def _get_direction(cls,port):
+        ''' Index in _moves of the port normal.'''
+
+        n=pt.Point(port.normal[1])-pt.Point(port.normal[0])
+
+        move=(int(np.sign(round(n.x,3))),int(np.sign(round(n.y,3))))
+
+        if not move in cls._moves:
+
+            raise ValueError(f"grid routing needs manhattan ports, port {port.name} has orientation {port.orientation}")
 
-# for cls in _allclasses:
+        return cls._moves.index(move)
 
-#     cls.draw=pt._pirel_cache(cls.draw)
+    def _get_exit(self,port,boxes,obstacles,width):
+        ''' Stub leaving port, as its points after the port midpoint and the index in _moves of its last direction.
 
-#     cls() # to init _params_dict
+        The stub runs along the port normal until it leaves boxes.
+        If an obstacle ahead stops it earlier (port next to the clearance),
+        the stub leaves the port sideways instead, bending right at the port
+        or up to width/2 behind it, where the trace still overlaps the port.
+        '''
+
+        p=pt.Point(port.midpoint)
+
+        k=self._get_direction(port)
+
+        stub=self._get_exit_point(p,k,boxes,obstacles,width)
+
+        # stubs within spacing from obstacles are retried without spacing (see _make_path)
+
+        if not _is_inside_boxes(np.array(stub.coord),obstacles+np.array([-1,-1,1,1])*width/2).any():
+
+            return [stub],k
+
+        n=pt.Point(*self._moves[k])
+
+        back=-min(self._get_stub_limit(p,n,obstacles,width),0.0)
+
+        if back>=width/2:
+
+            return [stub],k
+
+        p_back=p-n*back
+
+        sideways=[]
+
+        for k_side in ((2,3) if k<2 else (0,1)):
+
+            side=self._get_exit_point(p_back,k_side,boxes,obstacles,width)
+
+            if _is_inside_boxes(np.array(side.coord),boxes).any():
+
+                continue
+
+            corner=side+pt.Point(*self._moves[k_side])*(width/2)
+
+            if not self._is_blocked(np.array([p_back.coord,corner.coord]),width,obstacles):
+
+                sideways.append((abs(side-p_back),k_side,side))
+
+        if not sideways:
+
+            return [stub],k
+
+        _,k_side,side=min(sideways,key=lambda x: x[:2])
+
+        return ([p_back] if back else [])+[side],k_side
+
+    def _get_exit_point(self,p,k,boxes,obstacles,width):
+        ''' First point from p along _moves[k] that is not inside boxes.
+
+        The stub stops short of the first obstacle ahead of p,
+        in which case the point can still be inside boxes.
+        '''
+
+        p0=p
+
+        n=pt.Point(*self._moves[k])
+
+        stop=max(self._get_stub_limit(p0,n,obstacles,width),0.0)
+
+        for _ in range(len(boxes)+1):
+
+            inside=_is_inside_boxes(np.array(p.coord),boxes)
+
+            if not inside.any():
+
+                return p
+
+            b=boxes[inside]
+
+            exits=np.concatenate((
+                (b[:,2]-p.x)*(n.x>0),(p.x-b[:,0])*(n.x<0),
+                (b[:,3]-p.y)*(n.y>0),(p.y-b[:,1])*(n.y<0)))
+
+            p=p+n*float(exits.max())
+
+            if (p.x-p0.x)*n.x+(p.y-p0.y)*n.y>=stop:
+
+                return p0+n*stop
+
+        raise ValueError("grid routing is impossible")
+
+    @staticmethod
+    def _get_stub_limit(p,n,obstacles,width):
+        ''' Longest stub from p along n that does not run into obstacles.
+
+        Negative if the trace end at p already overlaps the first obstacle ahead.
+        '''
+
+        if not len(obstacles):
+
+            return np.inf
+
+        if n.x:
+
+            near=(obstacles[:,0]-p.x) if n.x>0 else (p.x-obstacles[:,2])
+
+            lo,hi,c=obstacles[:,1],obstacles[:,3],p.y
+
+        else:
+
+            near=(obstacles[:,1]-p.y) if n.y>0 else (p.y-obstacles[:,3])
+
+            lo,hi,c=obstacles[:,0],obstacles[:,2],p.x
+
+        ahead=(near>-1e-9)&(lo<c+width/2-1e-9)&(hi>c-width/2+1e-9)
+
+        if not ahead.any():
+
+            return np.inf
+
+        return float(near[ahead].min())-width/2
+
+    @staticmethod
+    def _is_blocked(points,width,boxes):
+
+        rects=Routing._get_trace_rectangles(points,width)
+
+        if rects is None:
+
+            return True
+
+        rects=rects[:,np.newaxis,:]
+
+        dx=np.minimum(rects[...,2],boxes[:,2])-np.maximum(rects[...,0],boxes[:,0])
+
+        dy=np.minimum(rects[...,3],boxes[:,3])-np.maximum(rects[...,1],boxes[:,1])
+
+        return bool(np.any((dx>1e-6)&(dy>1e-6)))
+
+    def _search_grid(self,start,end,start_dir,end_dir,boxes,
+        bend_penalty=0,strict_start=False,strict_end=False,shared=(),margin=0):
+        ''' A* search on the grid spanned by start, end and the boxes edges.
+
+        Parameters
+        ----------
+        start, end : pt.Point
+
+        start_dir, end_dir : int
+            index in _moves of the directions leaving start and reaching end.
+
+        boxes : numpy.ndarray
+            obstacles already grown by half the trace width.
+
+        bend_penalty : float
+
+        strict_start, strict_end : bool
+            if True, no bend is allowed at start (end).
+
+        shared : iterable of (x0,y0,x1,y1)
+            segments of previous routes, that cost _shared_cost per unit length.
+
+        margin : float
+            if positive, the grid is framed by lines this far outside
+            start, end and the boxes, so that routes can go around all of them.
+
+        Returns
+        -------
+        points : list of pt.Point
+            path vertices from start to end.
+        '''
+
+        import heapq
+
+        shared=np.asarray(shared,dtype=float).reshape(-1,4)
+
+        xs=np.unique(np.round(np.concatenate(([start.x,end.x],boxes[:,0],boxes[:,2],shared[:,0],shared[:,2])),6))
+
+        ys=np.unique(np.round(np.concatenate(([start.y,end.y],boxes[:,1],boxes[:,3],shared[:,1],shared[:,3])),6))
+
+        if margin>0:
+
+            xs=np.unique(np.concatenate(([xs[0]-margin],xs,[xs[-1]+margin])))
+
+            ys=np.unique(np.concatenate(([ys[0]-margin],ys,[ys[-1]+margin])))
+
+        # free[0][i,j] : edge (xs[i],ys[j])-(xs[i+1],ys[j]) is legal
+        # free[1][i,j] : edge (xs[i],ys[j])-(xs[i],ys[j+1]) is legal
+
+        free=(
+            ~_is_inside_boxes(np.stack(np.meshgrid((xs[:-1]+xs[1:])/2,ys,indexing='ij'),axis=-1),boxes).any(axis=-1),
+            ~_is_inside_boxes(np.stack(np.meshgrid(xs,(ys[:-1]+ys[1:])/2,indexing='ij'),axis=-1),boxes).any(axis=-1))
+
+        # cost per unit length of each edge
+
+        unit_cost=(
+            np.where(_is_on_segments(np.stack(np.meshgrid((xs[:-1]+xs[1:])/2,ys,indexing='ij'),axis=-1),shared),self._shared_cost,1.0),
+            np.where(_is_on_segments(np.stack(np.meshgrid(xs,(ys[:-1]+ys[1:])/2,indexing='ij'),axis=-1),shared),self._shared_cost,1.0))
+
+        min_cost=self._shared_cost if len(shared) else 1.0
+
+        i0,j0=np.searchsorted(xs,round(start.x,6)),np.searchsorted(ys,round(start.y,6))
+
+        i1,j1=np.searchsorted(xs,round(end.x,6)),np.searchsorted(ys,round(end.y,6))
+
+        def _heuristic(i,j):
+
+            return (abs(xs[i]-xs[i1])+abs(ys[j]-ys[j1]))*min_cost
+
+        start_state=(i0,j0,start_dir)
+
+        queue=[(_heuristic(i0,j0),0.0,*start_state)]
+
+        parents={start_state:None}
+
+        costs={start_state:0.0}
+
+        while queue:
+
+            _,cost,i,j,k=heapq.heappop(queue)
+
+            if cost>costs[(i,j,k)]:
+
+                continue
+
+            if (i,j)==(i1,j1) and k==end_dir:
+
+                break
+
+            steps=[]
+
+            for k_new,(di,dj) in enumerate(self._moves):
+
+                if k_new^1==k or (strict_start and (i,j,k)==start_state and not k_new==k):
+
+                    continue
+
+                i_new,j_new=i+di,j+dj
+
+                if not (0<=i_new<len(xs) and 0<=j_new<len(ys)):
+
+                    continue
+
+                if di and not free[0][min(i,i_new),j]:
+
+                    continue
+
+                if dj and not free[1][i,min(j,j_new)]:
+
+                    continue
+
+                if di:
+
+                    length=abs(xs[i_new]-xs[i])*unit_cost[0][min(i,i_new),j]
+
+                else:
+
+                    length=abs(ys[j_new]-ys[j])*unit_cost[1][i,min(j,j_new)]
+
+                steps.append((i_new,j_new,k_new,length))
+
+            if (i,j)==(i1,j1) and not strict_end and not k^1==end_dir:
+
+                # bend into the destination overhang
+
+                steps.append((i,j,end_dir,0))
+
+            for i_new,j_new,k_new,length in steps:
+
+                new_cost=cost+length+(0 if k_new==k else bend_penalty)
+
+                state=(i_new,j_new,k_new)
+
+                if new_cost<costs.get(state,np.inf):
+
+                    costs[state]=new_cost
+
+                    parents[state]=(i,j,k)
+
+                    heapq.heappush(queue,(new_cost+_heuristic(i_new,j_new),new_cost,*state))
+
+        else:
+
+            raise ValueError("grid routing is impossible")
+
+        points=[]
+
+        state=(i,j,k)
+
+        while state is not None:
+
+            points.append(pt.Point(float(xs[state[0]]),float(ys[state[1]])))
+
+            state=parents[state]
+
+        points.reverse()
+
+        return points
+
+def _is_on_segments(points,segments):
+    ''' Boolean array (points.shape[:-1]), True where points lie on any of the manhattan segments.'''
+
+    if not len(segments):
+
+        return np.zeros(points.shape[:-1],dtype=bool)
+
+    x=points[...,0,np.newaxis]
+
+    y=points[...,1,np.newaxis]
+
+    x0,x1=np.minimum(segments[:,0],segments[:,2]),np.maximum(segments[:,0],segments[:,2])
+
+    y0,y1=np.minimum(segments[:,1],segments[:,3]),np.maximum(segments[:,1],segments[:,3])
+
+    return np.any(
+        (x0-1e-9<=x)&(x<=x1+1e-9)&(y0-1e-9<=y)&(y<=y1+1e-9),axis=-1)
+
+def _is_inside_boxes(points,boxes):
+    ''' Boolean array (points.shape[:-1],len(boxes)), True where points are strictly inside boxes.'''
+
+    x=points[...,0,np.newaxis]
+
+    y=points[...,1,np.newaxis]
+
+    return (boxes[:,0]<x-1e-9)&(x<boxes[:,2]-1e-9)&(boxes[:,1]<y-1e-9)&(y<boxes[:,3]-1e-9)
+
+class MultiRouting(GridRouting):
+    ''' Generate routing connections between all sources and destinations.
+
+    Routes are planned one after the other, from the shortest,
+    and each route is drawn to reuse segments of the previous ones.
+    Trace rectangles on the same line are merged, and the result is a single
+    polygon set per layer.
+
+    Attributes
+    ----------
+    source: iterable of phidl.Port
+
+    destination: iterable of phidl.Port
+
+    layer : int or set of int.
+    '''
+
+    def __init__(self,*args,**kwargs):
+
+        super().__init__(*args,**kwargs)
+        self.source=ld.MultiRoutingsources
+        self.destination=ld.MultiRoutingdestinations
+        self.layer=ld.MultiRoutinglayer
+
+    def draw(self):
+
+        cell=Device(self.name)
+
+        pairs=[(s,d) for s in pt._return_iterable(self.source)
+            for d in pt._return_iterable(self.destination)]
+
+        pairs.sort(key=lambda x: abs(pt.Point(x[1].midpoint)-pt.Point(x[0].midpoint)))
+
+        shared=[]
+
+        rects=[]
+
+        for s,d in pairs:
+
+            points=self._make_path(s,d,shared).points
+
+            shared.extend(np.hstack((points[:-1],points[1:])))
+
+            rects.append(self._get_trace_rectangles(points,self._get_trace_width(s,d)))
+
+        if rects:
+
+            rt.RectSet(np.concatenate(rects),layer=self.layer).add_to(cell)
+
+        return cell
+
+def _remove_collinear_points(points):
+
+    out=points[0:1]
+
+    for p0,p1 in zip(points[1:],points[2:]):
+
+        a=p0-out[-1]
+
+        b=p1-p0
+
+        if not (a.x*b.y==a.y*b.x and a.dot(b)>0):
+
+            out.append(p0)
+
+    return out+points[-1:]
+
+_allclasses=(Text,Rect,IDTSingle,IDT,PartialEtchIDT,Bus,EtchPit,Anchor,MultiAnchor,Via,Routing,GridRouting,MultiRouting,GSProbe,GSGProbe,
+Pad,ViaInPad,LFERes,TwoDMR,TFERes)
@@ -79,11 +79,14 @@ def copy_ports(source,dest,prefix='',suffix=''):
 
         dest.add_port(port=p,name=prefix+n+suffix)
 
-def find_ports(cell,tag,depth=None,exact=False):
+def find_ports(cell,tag,depth=None,exact=False,orientation=None):
     ''' Finds ports within cell.
 
         Supports hierarchy search (through depth parameter), and exact match (trough exact parameter).
 
+        Port names of each Device are indexed on first search (see _PortIndex),
+        so that repeated searches only scan the hierarchy for depth other than 0.
+
         Attributes:
         ----------
             cell : dl.Device
@@ -94,44 +97,142 @@ def find_ports(cell,tag,depth=None,exact=False):
 
             exact : boolean (default False)
 
+            orientation : float (optional)
+                if given, only ports with this orientation are returned.
+
         Returns:
             list of dl.Port.
         '''
 
-    output=[]
-
     if isinstance(cell,Device):
 
-        for port in cell.get_ports(depth=depth):
+        if depth==0:
 
-            if exact:
+            index=_get_port_index(cell)
 
-                if port.name==tag:
+            output=[index[n]._copy(new_uid=False) for n in index.find(tag,exact)]
 
-                    output.append(port)
+        else:
 
-            else:
+            output=[port for port in cell.get_ports(depth=depth) \
+                if (port.name==tag if exact else tag in port.name)]
 
-                if tag in port.name:
+    elif isinstance(cell,DeviceReference):
 
-                    output.append(port)
+        ports=cell.ports
 
-        return output
+        output=[ports[n] for n in _get_port_index(cell.parent).find(tag,exact)]
 
-    elif isinstance(cell,DeviceReference):
+    else:
+
+        return None
+
+    if orientation is not None:
+
+        output=[p for p in output if round((p.orientation-orientation)%360,3) in (0,360)]
+
+    return output
+
+class _PortIndex(dict):
+    ''' Device.ports replacement that keeps find_ports results up to date.
+
+    Results of name searches are stored by tag and updated
+    as ports are added or removed, instead of scanning all ports each time.
+    '''
+
+    __slots__=('_tags',)
+
+    def __init__(self,*args,**kwargs):
+
+        super().__init__(*args,**kwargs)
+
+        self._tags={}
+
+    def find(self,tag,exact=False):
+        ''' Names of the ports matching tag, in insertion order.'''
+
+        if exact:
+
+            return [tag] if tag in self else []
+
+        names=self._tags.get(tag)
+
+        if names is None:
+
+            names=self._tags[tag]=[n for n in self if tag in n]
+
+        return names
+
+    def __setitem__(self,name,port):
+
+        if not name in self:
+
+            for tag,names in self._tags.items():
+
+                if tag in name:
+
+                    names.append(name)
+
+        super().__setitem__(name,port)
+
+    def __delitem__(self,name):
+
+        super().__delitem__(name)
+
+        self._forget(name)
+
+    def pop(self,name,*default):
+
+        if name in self:
+
+            self._forget(name)
+
+        return super().pop(name,*default)
+
+    def popitem(self):
+
+        name,port=super().popitem()
+
+        self._forget(name)
+
+        return name,port
+
+    def setdefault(self,name,port=None):
+
+        if not name in self:
+
+            self[name]=port
+
+        return self[name]
+
+    def update(self,*args,**kwargs):
+
+        for name,port in dict(*args,**kwargs).items():
+
+            self[name]=port
+
+    def clear(self):
+
+        super().clear()
+
+        self._tags.clear()
+
+    def __reduce__(self):
+
+        return (_PortIndex,(dict(self),))
 
-        for port in cell.ports.values():
+    def _forget(self,name):
 
-            if exact:
+        for names in self._tags.values():
 
-                if port.name==tag:
+            if name in names:
 
-                    output.append(port)
+                names.remove(name)
 
-            else:
+def _get_port_index(device):
 
-                if tag in port.name:
+    if not isinstance(device.ports,_PortIndex):
 
-                    output.append(port)
+        device.ports=_PortIndex(device.ports)
 
-        return output
+    return device.ports
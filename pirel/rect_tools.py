@@ -0,0 +1,498 @@
+from phidl.device_layout import Device
+
+import phidl.device_layout as dl
+
+import numpy as np
+
+_max_grid_size=int(1e7)
+
+class RectSet:
+    ''' Manhattan geometry stored as axis-aligned rectangles.
+
+    Each layer holds an (N,4) array of x0,y0,x1,y1 rectangles.
+    Union, subtraction and intersection are computed on the grid
+    spanned by the rectangle edges instead of through polygon booleans,
+    and polygons are only generated when the set is exported with
+    `to_device` or `add_to`.
+
+    Pcells use it where many rectangles are built at once (IDT fingers,
+    MultiRouting traces) and export them to their cell right away:
+    drawn cells, joins and the rest of the layout stay phidl polygons.
+
+    Parameters
+    ----------
+        rects : array-like of shape (N,4) or (4,) (optional)
+
+        layer : int, tuple or set
+            layer(s) the rectangles are added to.
+    '''
+
+    __slots__=('_rects',)
+
+    def __init__(self,rects=None,layer=0):
+
+        self._rects={}
+
+        if rects is not None:
+
+            self.add(rects,layer)
+
+    @classmethod
+    def from_device(cls,device):
+        ''' Build a RectSet from all the polygons of a device.
+
+        Parameters
+        ----------
+            device : phidl.Device
+
+        Returns
+        -------
+            RectSet.
+
+        Raises
+        ------
+            ValueError
+                if device contains polygons that are not rectilinear.
+        '''
+
+        out=cls()
+
+        for layer,polygons in device.get_polygons(by_spec=True).items():
+
+            out.add_polygons(polygons,layer)
+
+        return out
+
+    def add_polygons(self,polygons,layer=0):
+        ''' Add rectilinear polygons, decomposed in rectangles.
+
+        Raises
+        ------
+            ValueError
+                if a polygon is not rectilinear.
+        '''
+
+        if len(polygons):
+
+            self.add(np.concatenate([_polygon_to_rects(p) for p in polygons]),layer)
+
+        return self
+
+    @property
+    def layers(self):
+
+        return list(self._rects.keys())
+
+    @property
+    def bbox(self):
+
+        rects=[r for r in self._rects.values() if len(r)]
+
+        if not rects:
+
+            return np.array([[0.0,0.0],[0.0,0.0]])
+
+        rects=np.concatenate(rects)
+
+        return np.array([
+            [rects[:,0].min(),rects[:,1].min()],
+            [rects[:,2].max(),rects[:,3].max()]])
+
+    def __getitem__(self,layer):
+
+        return self._rects.get(dl._parse_layer(layer),np.empty((0,4)))
+
+    def __len__(self):
+
+        return sum(len(r) for r in self._rects.values())
+
+    def __repr__(self):
+
+        return "RectSet({})".format(
+            ",".join("{}:{}".format(l,len(r)) for l,r in self._rects.items()))
+
+    def copy(self):
+
+        out=RectSet()
+
+        out._rects={l:r.copy() for l,r in self._rects.items()}
+
+        return out
+
+    def add(self,rects,layer=0):
+        ''' Add rectangles to one or more layers.
+
+        Rectangles are stored as given: overlaps are resolved by `merge`.
+
+        Parameters
+        ----------
+            rects : array-like of shape (N,4) or (4,)
+
+            layer : int, tuple or set.
+
+        Returns
+        -------
+            self.
+        '''
+
+        rects=_normalize(rects)
+
+        for l in _parse_layers(layer):
+
+            if l in self._rects:
+
+                self._rects[l]=np.concatenate((self._rects[l],rects))
+
+            else:
+
+                self._rects[l]=rects
+
+        return self
+
+    def remove_layers(self,layers):
+
+        for l in _parse_layers(layers):
+
+            self._rects.pop(l,None)
+
+        return self
+
+    def move(self,dx=0,dy=0):
+        ''' Translate all rectangles in place.'''
+
+        shift=np.array([dx,dy,dx,dy],dtype=float)
+
+        self._rects={l:np.round(r+shift,6) for l,r in self._rects.items()}
+
+        return self
+
+    def array(self,columns=1,rows=1,spacing=(0,0)):
+        ''' Returns a new RectSet with the set tiled on a regular grid.
+
+        Equivalent to add_array() followed by flatten() on a phidl.Device.
+        '''
+
+        i,j=np.meshgrid(np.arange(columns),np.arange(rows),indexing='ij')
+
+        shift=np.column_stack((i.ravel()*spacing[0],j.ravel()*spacing[1]))
+
+        shift=np.tile(shift,2)
+
+        out=RectSet()
+
+        for l,r in self._rects.items():
+
+            out._rects[l]=np.round((r[np.newaxis,:,:]+shift[:,np.newaxis,:]).reshape(-1,4),6)
+
+        return out
+
+    def merge(self):
+        ''' Replace the rectangles of each layer by a disjoint set covering the same area.
+
+        Returns
+        -------
+            self.
+        '''
+
+        self._rects={l:_boolean(r,None,'or') for l,r in self._rects.items()}
+
+        return self
+
+    def __or__(self,other):
+
+        return self._apply(other,'or')
+
+    def __and__(self,other):
+
+        return self._apply(other,'and')
+
+    def __sub__(self,other):
+
+        return self._apply(other,'not')
+
+    def area(self,by_spec=False):
+        ''' Area covered by the set, counting overlaps once.
+
+        Parameters
+        ----------
+            by_spec : boolean
+                if True, returns a dict with the area of each layer.
+        '''
+
+        areas={l:float(np.sum((r[:,2]-r[:,0])*(r[:,3]-r[:,1])))
+            for l,r in self.copy().merge()._rects.items()}
+
+        if by_spec:
+
+            return areas
+
+        else:
+
+            return sum(areas.values())
+
+    def covers(self,boxes,layers=None,tolerance=1e-3):
+        ''' Tests which boxes are covered by the union of the set.
+
+        Parameters
+        ----------
+            boxes : array-like of shape (N,4)
+
+            layers : int, tuple or set (optional)
+                layers considered, all if None.
+
+            tolerance : float
+                uncovered area allowed in each box.
+
+        Returns
+        -------
+            numpy.ndarray of N booleans.
+        '''
+
+        boxes=np.asarray(boxes,dtype=float).reshape(-1,4)
+
+        keys=self.layers if layers is None else _parse_layers(layers)
+
+        rects=[self[l] for l in keys]
+
+        rects=_boolean(np.concatenate(rects),None,'or') if rects else np.empty((0,4))
+
+        covered=np.zeros(len(boxes))
+
+        step=max(1,_max_grid_size//max(1,len(boxes)))
+
+        for k in range(0,len(rects),step):
+
+            r=rects[np.newaxis,k:k+step]
+
+            b=boxes[:,np.newaxis]
+
+            dx=np.minimum(b[...,2],r[...,2])-np.maximum(b[...,0],r[...,0])
+
+            dy=np.minimum(b[...,3],r[...,3])-np.maximum(b[...,1],r[...,1])
+
+            covered+=(np.clip(dx,0,None)*np.clip(dy,0,None)).sum(axis=1)
+
+        area=(boxes[:,2]-boxes[:,0])*(boxes[:,3]-boxes[:,1])
+
+        return covered>=area-tolerance
+
+    def add_to(self,device):
+        ''' Add the merged rectangles to device as polygons.
+
+        Parameters
+        ----------
+            device : phidl.Device
+
+        Returns
+        -------
+            device.
+        '''
+
+        for l,r in self.copy().merge()._rects.items():
+
+            for x0,y0,x1,y1 in r.tolist():
+
+                device.add_polygon([(x0,y0),(x1,y0),(x1,y1),(x0,y1)],layer=l)
+
+        return device
+
+    def to_device(self,name='Unnamed'):
+        ''' Returns a new phidl.Device with the merged rectangles.'''
+
+        return self.add_to(Device(name))
+
+    def _apply(self,other,operation):
+
+        out=RectSet()
+
+        for l in dict.fromkeys(self.layers+other.layers):
+
+            rects=_boolean(self[l],other[l],operation)
+
+            if len(rects):
+
+                out._rects[l]=rects
+
+        return out
+
+def _parse_layers(layer):
+
+    if isinstance(layer,set):
+
+        return [dl._parse_layer(l) for l in layer]
+
+    else:
+
+        return [dl._parse_layer(layer)]
+
+def _normalize(rects):
+
+    rects=np.round(np.asarray(rects,dtype=float).reshape(-1,4),6)
+
+    rects=np.column_stack((
+        np.minimum(rects[:,0],rects[:,2]),
+        np.minimum(rects[:,1],rects[:,3]),
+        np.maximum(rects[:,0],rects[:,2]),
+        np.maximum(rects[:,1],rects[:,3])))
+
+    return rects[(rects[:,2]>rects[:,0])&(rects[:,3]>rects[:,1])]
+
+def _polygon_to_rects(polygon):
+    ''' Decompose a rectilinear polygon in rectangles, raises ValueError otherwise.'''
+
+    polygon=np.round(polygon,6)
+
+    edges=np.roll(polygon,-1,axis=0)-polygon
+
+    if not np.all((edges[:,0]==0)|(edges[:,1]==0)):
+
+        raise ValueError("polygon is not rectilinear")
+
+    xs=np.unique(polygon[:,0])
+
+    ys=np.unique(polygon[:,1])
+
+    if len(xs)==2 and len(ys)==2:
+
+        return np.array([[xs[0],ys[0],xs[1],ys[1]]])
+
+    # even-odd rule on the cell centers, casting rays towards +x
+
+    vertical=edges[:,0]==0
+
+    ex=polygon[vertical,0]
+
+    ey0=np.minimum(polygon[vertical,1],polygon[vertical,1]+edges[vertical,1])
+
+    ey1=np.maximum(polygon[vertical,1],polygon[vertical,1]+edges[vertical,1])
+
+    cx=(xs[:-1]+xs[1:])/2
+
+    cy=(ys[:-1]+ys[1:])/2
+
+    crossings=(ex>cx[:,np.newaxis,np.newaxis])&\
+        (ey0<cy[np.newaxis,:,np.newaxis])&\
+        (ey1>cy[np.newaxis,:,np.newaxis])
+
+    return _grid_to_rects(crossings.sum(axis=-1)%2==1,xs,ys)
+
+def _boolean(a,b,operation):
+    ''' Boolean between two (N,4) rectangle arrays, returned as disjoint rectangles.
+
+    The plane is split in the cells of the grid spanned by all edges,
+    processed in bands of rows to bound memory.
+    '''
+
+    if b is None:
+
+        b=np.empty((0,4))
+
+    rects=np.concatenate((a,b))
+
+    if not len(rects):
+
+        return np.empty((0,4))
+
+    xs=np.unique(rects[:,[0,2]])
+
+    ys=np.unique(rects[:,[1,3]])
+
+    step=max(1,_max_grid_size//len(xs))
+
+    out=[]
+
+    for j in range(0,len(ys)-1,step):
+
+        band=ys[j:j+step+1]
+
+        grid_a=_rasterize(a,xs,band)
+
+        grid_b=_rasterize(b,xs,band)
+
+        if operation=='or':
+
+            grid=grid_a|grid_b
+
+        elif operation=='and':
+
+            grid=grid_a&grid_b
+
+        elif operation=='not':
+
+            grid=grid_a&~grid_b
+
+        else:
+
+            raise ValueError("operation {} not supported".format(operation))
+
+        out.append(_grid_to_rects(grid,xs,band))
+
+    return np.concatenate(out)
+
+def _rasterize(rects,xs,ys):
+    ''' Boolean (len(xs)-1,len(ys)-1) grid of the cells covered by rects.'''
+
+    y0=np.maximum(rects[:,1],ys[0])
+
+    y1=np.minimum(rects[:,3],ys[-1])
+
+    inside=y1>y0
+
+    i0=np.searchsorted(xs,rects[inside,0])
+
+    i1=np.searchsorted(xs,rects[inside,2])
+
+    j0=np.searchsorted(ys,y0[inside])
+
+    j1=np.searchsorted(ys,y1[inside])
+
+    cover=np.zeros((len(xs),len(ys)),dtype=np.int32)
+
+    np.add.at(cover,(i0,j0),1)
+
+    np.add.at(cover,(i1,j0),-1)
+
+    np.add.at(cover,(i0,j1),-1)
+
+    np.add.at(cover,(i1,j1),1)
+
+    return cover.cumsum(axis=0).cumsum(axis=1)[:-1,:-1]>0
+
+def _grid_to_rects(grid,xs,ys):
+    ''' Rectangles covering the True cells of grid.
+
+    Cells are merged in maximal runs along x,
+    then runs spanning the same columns are stacked along y.
+    '''
+
+    padded=np.zeros((grid.shape[0]+2,grid.shape[1]),dtype=np.int8)
+
+    padded[1:-1]=grid
+
+    step=np.diff(padded,axis=0).T
+
+    row,start=np.nonzero(step==1)
+
+    _,end=np.nonzero(step==-1)
+
+    if not len(row):
+
+        return np.empty((0,4))
+
+    order=np.lexsort((row,end,start))
+
+    row,start,end=row[order],start[order],end[order]
+
+    new=np.ones(len(row),dtype=bool)
+
+    new[1:]=(start[1:]!=start[:-1])|(end[1:]!=end[:-1])|(row[1:]!=row[:-1]+1)
+
+    first=np.flatnonzero(new)
+
+    last=np.append(first[1:],len(row))-1
+
+    return np.column_stack((
+        xs[start[first]],
+        ys[row[first]],
+        xs[end[first]],
+        ys[row[last]+1]))
@@ -1,4 +1,4 @@
-from pirel.tools import Point
+from pirel.tools import Point,PointArray,_new_point
 
 from abc import ABC, abstractmethod
 
@@ -10,7 +10,7 @@ from phidl import set_quickplot_options
 
 from phidl import quickplot as qp
 
-import warnings, re, pathlib, gdspy, pdb, functools, inspect
+import warnings, re, pathlib, gdspy, pdb, functools, inspect, hashlib
 
 import phidl.geometry as pg
 
@@ -20,18 +20,295 @@ import phidl.device_layout as dl
 
 import phidl.path as path
 
-def join(device : Device) -> Device:
+import pirel.rect_tools as rt
+
+_lazy_join=False
+
+_raw_polygons=0
+
+def join(device : Device, lazy=None) -> Device:
     ''' returns a copy of device with all polygons joined.
 
     Parameters
     ----------
     device : phidl.Device.
+
+    lazy : boolean (optional)
+        if True, the copy is flattened but the union is deferred until
+        its polygons are accessed (get_polygons, area, write_gds ...).
+        Defaults to the mode set by enable_lazy_join().
+    '''
+
+    if lazy is None:
+
+        lazy=_lazy_join
+
+    if lazy:
+
+        return _LazyJoinDevice(device)
+
+    else:
+
+        return _join(device)
+
+def enable_lazy_join():
+    ''' Defer the unions of join() until export.
+
+    Joined cells nested into other joined cells are merged only once,
+    by the outermost join.
+    '''
+
+    global _lazy_join
+
+    _lazy_join=True
+
+def disable_lazy_join():
+    ''' Compute the unions of join() immediately (default).'''
+
+    global _lazy_join
+
+    _lazy_join=False
+
+def resolve_joins(device : Device) -> Device:
+    ''' Compute all deferred unions in device and its dependencies.
+
+    Parameters
+    ----------
+    device : phidl.Device.
+
+    Returns
+    -------
+    device : phidl.Device.
+    '''
+
+    for cell in (device,*device.get_dependencies(recursive=True)):
+
+        if isinstance(cell,_LazyJoinDevice):
+
+            cell._resolve()
+
+    return device
+
+def deduplicate(device : Device) -> Device:
+    ''' Replace structurally identical cells in device hierarchy by a single cell.
+
+    Cells are compared by content (polygons and labels at 1 nm resolution,
+    references and their transformations), and the kept cells are renamed
+    as <name>_<digest> so that names are stable across runs.
+    References are modified in place, so it is meant to be called
+    right before export.
+
+    Parameters
+    ----------
+    device : phidl.Device.
+
+    Returns
+    -------
+    device : phidl.Device.
+    '''
+
+    resolve_joins(device)
+
+    digests={}
+
+    def _digest(cell):
+
+        if not id(cell) in digests:
+
+            digests[id(cell)]=_get_cell_digest(cell,_digest)
+
+        return digests[id(cell)]
+
+    canonical={}
+
+    for cell in (device,*device.get_dependencies(recursive=True)):
+
+        for ref in cell.references:
+
+            digest=_digest(ref.ref_cell)
+
+            if not digest in canonical:
+
+                canonical[digest]=ref.ref_cell
+
+                suffix="_"+digest[:8]
+
+                if not ref.ref_cell.name.endswith(suffix):
+
+                    ref.ref_cell.name=ref.ref_cell.name[:_max_cellname_length-len(suffix)]+suffix
+
+            ref.ref_cell=canonical[digest]
+
+    return device
+
+def write_gds(device : Device, filename, dedup=True, **kwargs):
+    ''' Write device to a .gds file, reusing identical subcells.
+
+    Parameters
+    ----------
+    device : phidl.Device.
+
+    filename : str or pathlib.Path
+
+    dedup : boolean (optional, default True)
+        if True, identical cells are written once (see deduplicate()).
+
+    **kwargs : passed to phidl.Device.write_gds.
+
+    Returns
+    -------
+    filename.
+    '''
+
+    if dedup:
+
+        deduplicate(device)
+
+    else:
+
+        resolve_joins(device)
+
+    return device.write_gds(filename,**kwargs)
+
+_max_cellname_length=28
+
+def _get_cell_digest(cell,get_digest):
+
+    h=hashlib.blake2b(digest_size=16)
+
+    polygons=[]
+
+    for polygonset in cell.polygons:
+
+        for points,layer,datatype in zip(polygonset.polygons,polygonset.layers,polygonset.datatypes):
+
+            polygons.append(repr((layer,datatype)).encode()+np.round(np.asarray(points)*1e3).astype(np.int64).tobytes())
+
+    for item in sorted(polygons):
+
+        h.update(item)
+
+    items=[]
+
+    for label in cell.labels:
+
+        items.append(('label',label.text,tuple(np.round(label.position,3)),label.layer,label.texttype))
+
+    for ref in cell.references:
+
+        items.append((
+            'ref',
+            get_digest(ref.ref_cell),
+            tuple(np.round(ref.origin,3)),
+            round(ref.rotation or 0,6),
+            ref.magnification or 1,
+            bool(ref.x_reflection),
+            getattr(ref,'columns',1),
+            getattr(ref,'rows',1),
+            tuple(np.round(getattr(ref,'spacing',(0,0)),3))))
+
+    for path in cell.paths:
+
+        items.append(('path',id(path)))
+
+    h.update(repr(sorted(items,key=repr)).encode())
+
+    return h.hexdigest()
+
+def _join(device):
+
+    global _raw_polygons
+
+    _raw_polygons+=1
+
+    try:
+
+        return pg.union(device,by_layer=True, precision=0.001,join_first=False)
+
+    finally:
+
+        _raw_polygons-=1
+
+class _LazyJoinDevice(Device):
+    ''' Flattened copy of a device, joined the first time its polygons are accessed.
+
+    Pending unions of nested _LazyJoinDevices are skipped while copying,
+    since they are covered by the union of this device.
     '''
 
+    def __init__(self,device):
+
+        global _raw_polygons
+
+        super().__init__('union')
+
+        self._joined=False
+
+        _raw_polygons+=1
+
+        try:
+
+            polygons=device.get_polygons(by_spec=True)
+
+        finally:
 
-    out_cell=pg.union(device,by_layer=True, precision=0.001,join_first=False)
+            _raw_polygons-=1
 
-    return out_cell
+        for layer,p in polygons.items():
+
+            self.add_polygon(p,layer=layer)
+
+    def _resolve(self):
+
+        if self._joined or _raw_polygons:
+
+            return
+
+        self._joined=True
+
+        # references added after join() are not merged, nor flattened
+
+        own=Device('union')
+
+        own.polygons=self.polygons
+
+        self.polygons=_join(own).polygons
+
+    def get_polygons(self,*args,**kwargs):
+
+        self._resolve()
+
+        return super().get_polygons(*args,**kwargs)
+
+    def get_polygonsets(self,*args,**kwargs):
+
+        self._resolve()
+
+        return super().get_polygonsets(*args,**kwargs)
+
+    def area(self,*args,**kwargs):
+
+        self._resolve()
+
+        return super().area(*args,**kwargs)
+
+    def remove_polygons(self,*args,**kwargs):
+
+        self._resolve()
+
+        return super().remove_polygons(*args,**kwargs)
+
+    def copy(self,*args,**kwargs):
+
+        self._resolve()
+
+        return super().copy(*args,**kwargs)
+
+    def to_gds(self,*args,**kwargs):
+
+        self._resolve()
+
+        return super().to_gds(*args,**kwargs)
 
 def get_corners(device : Device) :
     ''' get corners of a device.
@@ -63,30 +340,55 @@ def get_corners(device : Device) :
     e : pt.Point.
     '''
     bbox=device.bbox
-    ll=Point(bbox[0,0],bbox[0,1])
-    lr=Point(bbox[1,0],bbox[0,1])
-    ul=Point(bbox[0,0],bbox[1,1])
-    ur=Point(bbox[1,0],bbox[1,1])
-    n=Point(device.center[0],bbox[1,1])
-    s=Point(device.center[0],bbox[0,1])
-    w=Point(bbox[0,0],device.center[1])
-    e=Point(bbox[1,0],device.center[1])
-    c=Point(device.center)
-
-    class ReferencePoints():
-        pass
-
-    r=ReferencePoints()
-    r.ll=ll
-    r.lr=lr
-    r.ul=ul
-    r.ur=ur
-    r.c=c
-    r.n=n
-    r.s=s
-    r.w=w
-    r.e=e
-    return r
+
+    key=bbox.tobytes()
+
+    cached=getattr(device,'_reference_points',None)
+
+    if cached is None or not cached._key==key:
+
+        cached=ReferencePoints(bbox)
+
+        cached._key=key
+
+        try:
+
+            device._reference_points=cached
+
+        except AttributeError:
+
+            pass
+
+    return cached
+
+class ReferencePoints:
+    ''' Corners, side midpoints and center of a bounding box (see get_corners()).
+
+    Instances are cached on the device and shared between calls:
+    they are recomputed as soon as the device bbox changes.
+    '''
+
+    __slots__=('ll','lr','ul','ur','c','n','s','w','e','_key')
+
+    def __init__(self,bbox):
+
+        (x0,y0),(x1,y1)=np.asarray(bbox).tolist()
+
+        xc=(x0+x1)/2
+
+        yc=(y0+y1)/2
+
+        self.ll=_new_point(x0,y0)
+        self.lr=_new_point(x1,y0)
+        self.ul=_new_point(x0,y1)
+        self.ur=_new_point(x1,y1)
+        self.c=_new_point(xc,yc)
+        self.n=_new_point(xc,y1)
+        self.s=_new_point(xc,y0)
+        self.w=_new_point(x0,yc)
+        self.e=_new_point(x1,yc)
+
+        self._key=None
 
 def check(device : Device, joined=False, blocking=True,gds=False,*a,**kw):
     ''' Shows the device layout.
@@ -177,19 +479,11 @@ def get_centroid(*points):
     --------
         pt.Point.
     '''
-    x_c=0
-    y_c=0
-
     if isinstance(points, Point):
 
         return points
 
-    for p in points:
-
-        x_c=x_c+p.x
-        y_c=y_c+p.y
-
-    return Point(x_c,y_c)/len(points)
+    return PointArray(points).centroid
 
 def get_centroid_ports(*ports):
     '''Calculate port with matching orientation and with as input ports, and midpoint at the
@@ -214,7 +508,7 @@ def get_centroid_ports(*ports):
 
     else:
 
-        ports_centroid=get_centroid(*[Point(x.midpoint) for x in ports])
+        ports_centroid=PointArray([x.midpoint for x in ports]).centroid
 
         ports_width=np.average([x.width for x in ports])
 
@@ -253,7 +547,7 @@ def copy_layer(cell,l1,l2):
         dl.Device.
     '''
 
-    flatcell=join(cell)
+    flatcell=join(cell,lazy=False)
 
     tobecopied=flatcell.get_polygons(byspec=(l1,0))
 
@@ -328,7 +622,8 @@ def is_cell_inside(
     ---------
     cell_test : Device
 
-    cell_ref : Device
+    cell_ref : Device or SpatialIndex
+        pass a SpatialIndex to run many queries on the same cell.
 
     tolerance : float (optional)
 
@@ -341,45 +636,37 @@ def is_cell_inside(
         in all direction
     '''
 
-    if tolerance==0:
-
-        return _is_cell_inside(cell_test,cell_ref)
-
-    else:
-
-        shifts_set=np.array([[1,1],[-1,-1],[1,-1],[-1,1]])*tolerance
-
-        for shift in shifts_set:
+    return _get_index(cell_ref).is_inside(cell_test,tolerance)
 
-            cell_test.move(destination=shift)
-
-            if not _is_cell_inside(
-                cell_test,
-                cell_ref):
-
-                cell_test.move(destination=-shift)
-
-                return False
-
-            else:
-
-                cell_test.move(destination=-shift)
-
-        else:
+def are_boxes_inside(
+    boxes,
+    cell_ref : Device,
+    tolerance : float =0,
+    layers=None):
+    ''' Vectorized is_cell_inside() for many rectangles.
 
-            return True
+    Parameters:
+    ---------
+    boxes : array-like of shape (N,4)
+        x0,y0,x1,y1 of each rectangle.
 
-def _is_cell_inside(cell_test,cell_ref):
+    cell_ref : Device or SpatialIndex
 
-    area_pre,area_post=_calculate_pre_post_area(cell_test,cell_ref)
+    tolerance : float (optional)
 
-    if round(area_pre,3) >= round(area_post,3)-1e-3:
+    layers : int, tuple or set (optional)
+        layers of cell_ref considered, all if None.
+        Ignored if cell_ref is a SpatialIndex.
 
-        return True
+    Returns:
+        numpy.ndarray of N booleans.
 
-    else:
+    Note:
+        as in is_cell_inside, a box is inside if it stays inside
+        when shifted by +-tolerance in both directions.
+    '''
 
-        return False
+    return _get_index(cell_ref,layers).are_boxes_inside(boxes,tolerance)
 
 def is_cell_outside(
     cell_test : Device ,
@@ -391,7 +678,8 @@ def is_cell_outside(
     ---------
     cell_test : Device
 
-    cell_ref : Device
+    cell_ref : Device or SpatialIndex
+        pass a SpatialIndex to run many queries on the same cell.
 
     tolerance : float (optional)
 
@@ -404,70 +692,287 @@ def is_cell_outside(
         in all direction
     '''
 
-    if tolerance==0:
+    return _get_index(cell_ref).is_outside(cell_test,tolerance)
 
-        return _is_cell_outside(cell_test,cell_ref)
+class SpatialIndex:
+    ''' Uniform grid over the polygons of a cell, for repeated geometric queries.
 
-    else:
+    Polygons are bucketed by bounding box once, so that each query only
+    runs exact booleans against the polygons its bounding box touches.
+    All the indexed layers are considered as a single region.
 
-        shifts_set=np.array([[1,1],[-1,-1],[1,-1],[-1,1]])*tolerance
+    Parameters
+    ----------
+    cell : Device, DeviceReference or list of polygons
 
-        for shift in shifts_set:
+    layers : int, tuple or set (optional)
+        layers of cell indexed, all if None.
 
-            cell_test.move(destination=shift)
+    cell_size : float (optional)
+        grid pitch, by default ~ one polygon per grid cell.
+    '''
 
-            if not _is_cell_outside(
-                cell_test,
-                cell_ref):
+    _area_tolerance=1e-3
 
-                cell_test.move(destination=-shift)
+    def __init__(self,cell,layers=None,cell_size=None):
 
-                return False
+        if layers is None:
+
+            polygons=_get_polygons(cell)
+
+        else:
+
+            layers={dl._parse_layer(l) for l in (layers if isinstance(layers,set) else {layers})}
+
+            polygons=[p for spec,polys in cell.get_polygons(by_spec=True).items() \
+                if spec in layers for p in polys]
+
+        self.polygons=[np.asarray(p,dtype=float) for p in polygons]
+
+        self.bboxes=np.array([[*p.min(axis=0),*p.max(axis=0)] for p in self.polygons]).reshape(-1,4)
+
+        self._rects=None
+
+        self._grid={}
+
+        self._grid_max=np.array([-1,-1])
+
+        if not len(self.polygons):
+
+            self.cell_size=1
+
+            self._origin=np.zeros(2)
+
+            return
 
-            else:
+        self._origin=self.bboxes[:,:2].min(axis=0)
+
+        if cell_size is None:
+
+            span=(self.bboxes[:,2:].max(axis=0)-self._origin).max()
+
+            cell_size=max(span/np.sqrt(len(self.polygons)),1e-3)
+
+        self.cell_size=cell_size
+
+        ranges=self._get_grid_range(self.bboxes)
+
+        self._grid_max=ranges[:,2:].max(axis=0)
+
+        for index,(i0,j0,i1,j1) in enumerate(ranges):
+
+            for i in range(i0,i1+1):
+
+                for j in range(j0,j1+1):
+
+                    self._grid.setdefault((i,j),[]).append(index)
+
+    @property
+    def bbox(self):
+
+        if not len(self.polygons):
+
+            return np.zeros((2,2))
+
+        return np.array([self.bboxes[:,:2].min(axis=0),self.bboxes[:,2:].max(axis=0)])
+
+    def query(self,bbox):
+        ''' Indices of the polygons whose bounding box touches bbox.
+
+        Parameters
+        ----------
+        bbox : array-like
+            ((x0,y0),(x1,y1)) or (x0,y0,x1,y1).
 
-                cell_test.move(destination=-shift)
+        Returns
+        -------
+        numpy.ndarray of int.
+        '''
+
+        bbox=np.asarray(bbox,dtype=float).reshape(1,4)
+
+        # grid cells outside the indexed polygons are empty
+
+        i0,j0,i1,j1=np.clip(self._get_grid_range(bbox)[0],0,np.tile(self._grid_max,2))
+
+        found=set()
+
+        if (i1-i0+1)*(j1-j0+1)>len(self._grid):
+
+            for (i,j),indices in self._grid.items():
+
+                if i0<=i<=i1 and j0<=j<=j1:
+
+                    found.update(indices)
 
         else:
 
-            return True
+            for i in range(i0,i1+1):
+
+                for j in range(j0,j1+1):
+
+                    found.update(self._grid.get((i,j),()))
+
+        found=np.fromiter(found,dtype=int,count=len(found))
+
+        b=self.bboxes[found]
+
+        touch=(b[:,0]<=bbox[0,2])&(b[:,2]>=bbox[0,0])&(b[:,1]<=bbox[0,3])&(b[:,3]>=bbox[0,1])
+
+        return np.sort(found[touch])
+
+    def overlap_area(self,test):
+        ''' Area of test that overlaps the indexed polygons.
+
+        Parameters
+        ----------
+        test : Device, DeviceReference, bbox or list of polygons.
+        '''
+
+        polygons=_get_polygons(test)
 
-def _is_cell_outside(cell_test,cell_ref):
+        candidates=self._get_candidates(polygons)
 
-    area_test=cell_test.area()
+        if not candidates:
 
-    area_ref,area_post=_calculate_pre_post_area(cell_test,cell_ref)
+            return 0
 
-    if round(area_post,3)>=round(area_ref+area_test,3)-1e-3:
+        overlap=gdspy.boolean(polygons,candidates,'and',precision=1e-4)
+
+        return 0 if overlap is None else overlap.area()
+
+    def is_inside(self,test,tolerance=0):
+        ''' Checks whether test is contained in the indexed polygons.
+
+        see is_cell_inside().
+        '''
+
+        for polygons in _get_shifted_polygons(_get_polygons(test),tolerance):
+
+            candidates=self._get_candidates(polygons)
+
+            outside=gdspy.boolean(polygons,candidates,'not',precision=1e-4)
+
+            if outside is not None and outside.area()>self._area_tolerance:
+
+                return False
 
         return True
 
-    else:
+    def is_outside(self,test,tolerance=0):
+        ''' Checks whether test does not overlap the indexed polygons.
 
-        return False
+        see is_cell_outside().
+        '''
 
-def _calculate_pre_post_area(cell_test,cell_ref):
+        for polygons in _get_shifted_polygons(_get_polygons(test),tolerance):
 
-    area_pre=cell_ref.area()
+            if self.overlap_area(polygons)>self._area_tolerance:
 
-    c_flat=pg.union(cell_ref, by_layer=False, layer=100)
+                return False
 
-    if isinstance(cell_test,Device):
+        return True
 
-        c_flat.add_ref(cell_test)
+    def are_boxes_inside(self,boxes,tolerance=0):
+        ''' Vectorized is_inside() for many (x0,y0,x1,y1) rectangles.
 
-    else:
+        Returns
+        -------
+        numpy.ndarray of booleans.
+        '''
+
+        boxes=np.asarray(boxes,dtype=float).reshape(-1,4)
 
-        if isinstance(cell_test,DeviceReference):
+        shifts=np.array([[1,1],[-1,-1],[1,-1],[-1,1]])*tolerance if tolerance else np.zeros((1,2))
 
-            c_flat.add(cell_test)
+        shifted=(boxes[np.newaxis]+np.tile(shifts,2)[:,np.newaxis]).reshape(-1,4)
 
-    area_post=_get_cell_area(c_flat)
+        rects=self._get_rects()
+
+        if rects is not None:
+
+            inside=rects.covers(shifted,tolerance=self._area_tolerance)
+
+        else:
 
-    return area_pre,area_post
+            inside=np.array([
+                self.is_inside([[x0,y0],[x1,y0],[x1,y1],[x0,y1]]) for x0,y0,x1,y1 in shifted],dtype=bool)
 
-def _get_cell_area(cell):
+        return inside.reshape(len(shifts),-1).all(axis=0)
+
+    def _get_rects(self):
+        ''' RectSet of the polygons, None if they are not rectilinear.'''
+
+        if self._rects is None:
+
+            try:
+
+                self._rects=rt.RectSet().add_polygons(self.polygons)
+
+            except ValueError:
+
+                self._rects=False
+
+        if self._rects is False:
+
+            return None
+
+        return self._rects
+
+    def _get_candidates(self,polygons):
+
+        if not len(polygons):
+
+            return []
+
+        points=np.concatenate(polygons)
+
+        return [self.polygons[i] for i in self.query((*points.min(axis=0),*points.max(axis=0)))]
+
+    def _get_grid_range(self,bboxes):
+
+        ij=np.floor((bboxes-np.tile(self._origin,2))/self.cell_size).astype(int)
+
+        return ij
+
+def _get_index(cell_ref,layers=None):
+
+    if isinstance(cell_ref,SpatialIndex):
+
+        return cell_ref
+
+    return SpatialIndex(cell_ref,layers=layers)
+
+def _get_polygons(item):
+    ''' Polygons of a Device, a reference, a bbox, a polygon or a list of polygons.'''
+
+    if hasattr(item,'get_polygons'):
+
+        return item.get_polygons()
+
+    if not len(item):
+
+        return []
+
+    if np.ndim(item[0])==2:
+
+        return [np.asarray(p,dtype=float) for p in item]
+
+    points=np.asarray(item,dtype=float)
+
+    if points.shape in ((2,2),(4,)):
+
+        (x0,y0),(x1,y1)=points.reshape(2,2)
+
+        return [np.array([[x0,y0],[x1,y0],[x1,y1],[x0,y1]])]
+
+    return [points]
+
+def _get_shifted_polygons(polygons,tolerance):
+
+    if tolerance==0:
 
-    c_flat=pg.union(cell, by_layer=False, layer=100)
+        return [polygons]
 
-    return c_flat.area()
+    return [[p+shift for p in polygons] \
+        for shift in np.array([[1,1],[-1,-1],[1,-1],[-1,1]])*tolerance]
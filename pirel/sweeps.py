@@ -510,10 +510,39 @@ class PArray(LayoutPart):
 
             text : pirel.pcells.Text
                 to control text appearance.
+
+            workers : int
+
+                if larger than 1, sweep points are drawn in parallel
+                by a pool of worker processes.
+
+            start_method : str
+
+                multiprocessing start method of the workers ('fork','spawn','forkserver'),
+                if None (default) the platform default is used.
+                Methods other than 'fork' pickle the device: classes built by
+                pirel modifiers are rebuilt in the workers from their decorator calls
+                (see pirel.tools.modifier), other unpicklable devices or params
+                are drawn serially, with a warning.
+
+            table_geometry : bool
+
+                if True, each sweep point is drawn before its parameters are
+                exported in table, if False it is never drawn.
+                If None (default), points are drawn only if drawing the device
+                changes its parameters (e.g. ports set by draw()),
+                since exported quantities that depend on geometry draw what they need.
+
+            hierarchical : bool
+
+                if True, sweep points are not flattened and joined, so that
+                identical subcells can be written once (see sketch_tools.write_gds).
     """
 
     x_param=_SweepParamValidator(ld.Arrayx_param)
 
+    _draw_cached=False
+
     def __init__(self,device,x_param,base_params=None,*a,**k):
 
         super().__init__(*a,**k)
@@ -534,6 +563,14 @@ class PArray(LayoutPart):
 
         self.text=pc.Text()
 
+        self.workers=1
+
+        self.start_method=None
+
+        self.table_geometry=None
+
+        self.hierarchical=False
+
     @property
     def device(self):
 
@@ -544,27 +581,34 @@ class PArray(LayoutPart):
 
         """ A pandas.DataFrame that represent all the parameters in PArray.device """
 
+        return _build_table(self.iter_table())
+
+    def iter_table(self):
+        """ Yields (label,params) for each sweep point, in table order."""
+
         param=self.x_param
 
         device=self.device
 
         base_params=device.get_params()
 
-        data_tot=DataFrame()
+        draw=_needs_drawing(device,self.table_geometry)
 
         for i in range(len(param)):
 
             print_index=1
 
-            for name in param.names:
+            point=device.clone()
 
-                device._set_params(param(i))
+            point._set_params(param(i))
 
-            device._set_params({"Name":base_params["Name"]+"_"+str(i)})
-                
-            device.draw()
+            point._set_params({"Name":base_params["Name"]+"_"+str(i)})
 
-            df=device.export_all()
+            if draw:
+
+                point.draw()
+
+            df=point.export_all()
 
             if self.labels_bottom is not None:
 
@@ -576,11 +620,20 @@ class PArray(LayoutPart):
 
             print("Generating table, item {} of {}\r".format(print_index,len(param)),end="")
 
-            data_tot=pd.concat([data_tot,Series(df,name=index)],axis=1)
+            yield index,df
 
-            device._set_params(base_params)
+    def write_table(self,path):
+        """ Streams table to a .csv file, with the same layout of table.to_csv().
 
-        return data_tot
+            Sweep points are written to disk as soon as they are exported,
+            so that memory does not grow with the number of points.
+
+            Parameters
+            ----------
+                path : str or pathlib.Path
+        """
+
+        _write_table(self.iter_table(),path)
 
     @property
     def base_params(self):
@@ -635,33 +688,61 @@ class PArray(LayoutPart):
 
         self.device._set_params(df)
 
+    def _export_point(self,*dfs):
+        """ export_all() of a copy of device, with dfs parameters applied."""
+
+        point=self.device.clone()
+
+        for df in dfs:
+
+            point._set_params(df)
+
+        return point.export_all()
+
     def draw(self):
 
-        device=self.device
+        points=[self._sweep_point(index) for index in range(len(self.x_param))]
 
-        df_original=device.get_params()
+        return self._assemble_cells(self._draw_sweep(points))
 
-        master_cell=Device(name=self.name)
+    def _sweep_point(self,index,steps=()):
+        """ Returns the (method,params) steps that bring device to a sweep point.
 
-        cells=[]
+            Parameters
+            ----------
+                index : int
 
-        param=self.x_param
+                    x_param index
+
+                steps : iterable (optional)
 
-        df={}
+                    steps to be applied before x_param.
+        """
+
+        steps=[*steps,('set_params',self.x_param(index))]
+
+        if self.base_params:
 
-        for index in range(len(param)):
+            steps.append(('set_params',self.base_params))
 
-            for name,value in zip(param.names,param.values):
+        return steps
 
-                df[name]=value[index]
+    def _draw_sweep(self,points):
+        """ Returns one joined cell per sweep point, in the same order of points.
 
-            device.set_params(df)
+            If self.workers>1, points are distributed to worker processes.
+            If self.hierarchical, cells reference the drawn device instead.
+        """
 
-            if self.base_params:
+        device=self.device
 
-                device.set_params(self.base_params)
+        return _draw_parallel(device,points,self.workers,self.hierarchical,self.start_method)
 
-            new_cell=st.join(device.draw())
+    def _assemble_cells(self,cells):
+
+        master_cell=Device(name=self.name)
+
+        for index,new_cell in enumerate(cells):
 
             new_cell.name=self.name+"_"+str(index+1)
 
@@ -687,17 +768,13 @@ class PArray(LayoutPart):
 
             master_cell<<new_cell
 
-            cells.append(new_cell)
-
         g=Group(cells)
 
         g.distribute(spacing=self.x_spacing)
 
         g.align(alignment='ymin')
 
-        device.set_params(df_original)
-
-        del device, cells ,g
+        del cells ,g
 
         return master_cell
 
@@ -784,8 +861,6 @@ class PArray(LayoutPart):
 
         sweep_param=self.x_param
 
-        df_original=self.get_params()
-
         if isinstance(param,str):
 
             param=[param]
@@ -796,9 +871,7 @@ class PArray(LayoutPart):
 
             for i in range(len(sweep_param)):
 
-                self._set_params(sweep_param(i))
-
-                df=self.export_all()
+                df=self._export_point(sweep_param(i))
 
                 y.append(df[param[0]])
 
@@ -819,9 +892,7 @@ class PArray(LayoutPart):
 
                 for i in range(len(sweep_param)):
 
-                    self._set_params(sweep_param(i))
-
-                    df=self.export_all()
+                    df=self._export_point(sweep_param(i))
 
                     y[j].append(df[param[j]])
 
@@ -839,8 +910,6 @@ class PArray(LayoutPart):
 
         self.x_param.populate_plot_axis(ax)
 
-        self._set_params(df_original)
-
         plt.show()
 
         return fig
@@ -861,10 +930,6 @@ class PMatrix(PArray):
 
     def draw(self):
 
-        device=self.device
-
-        df_original=device.get_params()
-
         master_name=self.name
 
         master_cell=Device(master_name)
@@ -879,19 +944,19 @@ class PMatrix(PArray):
 
         x_param=self.x_param
 
-        df={}
-
-        dlist=[]
+        points=[]
 
         for index in range(len(y_param)):
 
-            for name,value in zip(y_param.names,y_param.values):
+            for i in range(len(x_param)):
+
+                points.append(self._sweep_point(i,[('_set_params',y_param(index))]))
 
-                df[name]=value[index]
+        all_cells=self._draw_sweep(points)
 
-            device._set_params(df)
+        dlist=[]
 
-            # print("drawing array {} of {}".format(index+1,len(y_param)),end='\r')
+        for index in range(len(y_param)):
 
             if top_label_matrix is not None:
 
@@ -927,18 +992,15 @@ class PMatrix(PArray):
 
             self.name=master_name+"Arr"+str(index+1)
 
-            new_cell=PArray.draw(self)
+            new_cell=self._assemble_cells(
+                all_cells[index*len(x_param):(index+1)*len(x_param)])
 
             dlist.extend(new_cell.references)
 
-            print("\033[K",end='')
-
             master_cell<<new_cell
 
             cells.append(new_cell)
 
-        device._set_params(df_original)
-
         self.labels_top=top_label_matrix
 
         self.labels_bottom=bottom_label_matrix
@@ -995,6 +1057,10 @@ class PMatrix(PArray):
     @property
     def table(self):
 
+        return _build_table(self.iter_table())
+
+    def iter_table(self):
+
         x_param=self.x_param
 
         y_param=self.y_param
@@ -1003,23 +1069,27 @@ class PMatrix(PArray):
 
         df_original=device.get_params()
 
-        data_tot=DataFrame()
+        draw=_needs_drawing(device,self.table_geometry)
 
         print_index=1
 
         for j in range(len(y_param)):
 
-            device._set_params(y_param(j))
-
             for i in range(len(x_param)):
 
-                device._set_params(x_param(i))
-                
-                device._set_params({"Name":df_original["Name"]+"_"+str(j)+"_"+str(i)})
+                point=device.clone()
+
+                point._set_params(y_param(j))
+
+                point._set_params(x_param(i))
+
+                point._set_params({"Name":df_original["Name"]+"_"+str(j)+"_"+str(i)})
 
-                device.draw()
+                if draw:
 
-                df=device.export_summary()
+                    point.draw()
+
+                df=point.export_summary()
 
                 if self.labels_bottom is not None:
 
@@ -1035,11 +1105,7 @@ class PMatrix(PArray):
 
                 print_index+=1
 
-                data_tot=pd.concat([data_tot,Series(df,name=index)],axis=1)
-
-        device._set_params(df_original)
-
-        return data_tot
+                yield index,df
 
     def plot_param(self,param):
 
@@ -1049,8 +1115,6 @@ class PMatrix(PArray):
 
         sweep_param_y=self.y_param
 
-        df_original=self.get_params()
-
         x=[*range(len(sweep_param_x))]
 
         y=[*range(len(sweep_param_y))]
@@ -1065,10 +1129,7 @@ class PMatrix(PArray):
 
             for i in x:
 
-                self._set_params(sweep_param_x(i))
-                self._set_params(sweep_param_y(j))
-
-                df=self.export_all()
+                df=self._export_point(sweep_param_x(i),sweep_param_y(j))
 
                 print("Getting {} value , item {} of {} ".format(param,print_index,len(x)*len(y)),end="\r")
                 # sys.stdout.flush()
@@ -1095,11 +1156,219 @@ class PMatrix(PArray):
         self.x_param.populate_plot_axis(ax,'x')
         self.y_param.populate_plot_axis(ax,'y')
 
-        self._set_params(df_original)
-
         return fig
 
-def export_matrix_data(pmatrix,param=None,type='csv',path='./'):
+_sweep_device=None
+
+_sweep_hierarchical=False
+
+def _init_sweep_worker(device,hierarchical=False):
+
+    global _sweep_device,_sweep_hierarchical
+
+    _sweep_device=device
+
+    _sweep_hierarchical=hierarchical
+
+def _needs_drawing(device,table_geometry=None):
+    ''' True if sweep points have to be drawn before exporting their parameters.
+
+        If table_geometry is None, a copy of device is drawn once,
+        and points are drawn only if that changed its parameters.
+    '''
+
+    if table_geometry is not None:
+
+        return table_geometry
+
+    point=device.clone()
+
+    before=pt._hashable(point.get_params())
+
+    point.draw()
+
+    return not pt._hashable(point.get_params())==before
+
+def _draw_point(device,steps,hierarchical=False):
+
+    device=device.clone()
+
+    for method,df in steps:
+
+        getattr(device,method)(df)
+
+    if hierarchical:
+
+        cell=Device()
+
+        cell<<device.draw()
+
+        return cell
+
+    return st.join(device.draw())
+
+def _draw_point_in_worker(steps):
+
+    return st.resolve_joins(_draw_point(_sweep_device,steps,_sweep_hierarchical))
+
+def _draw_parallel(device,points,workers,hierarchical=False,start_method=None):
+    ''' Draws sweep points in a process pool.
+
+        Points are drawn serially if workers<=1, or if the start method
+        needs to pickle device and it is not picklable (decorated classes are,
+        if their decorators are wrapped by pirel.tools.modifier).
+
+        Parameters
+        ----------
+            device : pirel.tools.LayoutPart
+
+            points : list of steps (see PArray._sweep_point)
+
+            workers : int
+
+            hierarchical : bool
+
+            start_method : str (optional)
+                multiprocessing start method, platform default if None.
+
+        Returns
+        -------
+            cells : list of phidl.Device
+    '''
+
+    import multiprocessing, pickle
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    if workers<=1 or len(points)<=1:
+
+        return [_draw_point(device,steps,hierarchical) for steps in points]
+
+    context=multiprocessing.get_context(start_method)
+
+    if not context.get_start_method()=='fork':
+
+        try:
+
+            pickle.dumps(device)
+
+        except Exception as e:
+
+            warnings.warn(f"{device.__class__.__name__} cannot be sent to '{context.get_start_method()}' workers ({e}), points are drawn serially")
+
+            return [_draw_point(device,steps,hierarchical) for steps in points]
+
+    chunksize=max(1,len(points)//(4*workers))
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_sweep_worker,
+        initargs=(device,hierarchical)) as executor:
+
+        cells=list(executor.map(_draw_point_in_worker,points,chunksize=chunksize))
+
+    for cell in cells:
+
+        pt._renew_uids(cell)
+
+    return cells
+
+def _build_table(rows):
+    """ Builds a DataFrame with one column per (label,params) in rows.
+
+        Values are accumulated in one list per parameter and the DataFrame
+        is built once, parameters missing in a sweep point are left NaN.
+    """
+
+    labels=[]
+
+    columns={}
+
+    for label,df in rows:
+
+        for key,value in df.items():
+
+            if not key in columns:
+
+                columns[key]=[np.nan]*len(labels)
+
+            columns[key].append(value)
+
+        labels.append(label)
+
+        for values in columns.values():
+
+            if len(values)<len(labels):
+
+                values.append(np.nan)
+
+    return DataFrame.from_dict(columns,orient='index',columns=labels)
+
+_table_block_size=256
+
+def _write_table(rows,path):
+    """ Writes (label,params) in rows to a .csv file, one column per row.
+
+        The layout is the same of table.to_csv() (one line per parameter).
+        Rows are first streamed to a temporary file, one line per row,
+        which is then transposed reading _table_block_size parameters per pass,
+        so that memory does not grow with the number of rows.
+    """
+
+    import csv, tempfile
+
+    path=pathlib.Path(path)
+
+    with tempfile.TemporaryFile('w+',newline='',dir=path.parent) as tmp:
+
+        writer=None
+
+        labels=[]
+
+        for label,df in rows:
+
+            if writer is None:
+
+                fieldnames=[*df.keys()]
+
+                writer=csv.DictWriter(tmp,fieldnames=['']+fieldnames)
+
+            elif not all(key in fieldnames for key in df):
+
+                raise ValueError(f"{label} has parameters not present in the first sweep point")
+
+            writer.writerow({'':label,**df})
+
+            labels.append(label)
+
+        with open(path,'w',newline='') as f:
+
+            out=csv.writer(f)
+
+            out.writerow(['']+labels)
+
+            if writer is None:
+
+                return
+
+            for start in range(0,len(fieldnames),_table_block_size):
+
+                block=fieldnames[start:start+_table_block_size]
+
+                columns=[[name] for name in block]
+
+                tmp.seek(0)
+
+                for line in csv.reader(tmp):
+
+                    for column,value in zip(columns,line[1+start:1+start+len(block)]):
+
+                        column.append(value)
+
+                out.writerows(columns)
+
+def export_matrix_data(pmatrix,param=None,type='csv',path='./',stream=False):
     ''' Writes PArray/PMatrix data in a .xlsx file.
 
         Parameters
@@ -1116,21 +1385,29 @@ def export_matrix_data(pmatrix,param=None,type='csv',path='./'):
             path : pathlib.Path
 
                 path to save files.
+
+            stream : bool (default False)
+
+                if True and type is 'csv', the table is streamed to file
+                (see PArray.write_table) instead of being built in memory first.
+                The file has the same layout in both cases.
     '''
 
     if isinstance(path,str):
 
         path=pathlib.Path(path)
 
-    t_mat1=pmatrix.table
-    
-    if type=='csv':
+    if stream and type=='csv':
+
+        pmatrix.write_table( path / " ".join([pmatrix.name,".csv"]))
 
-        t_mat1.to_csv( path / " ".join([pmatrix.name,".csv"]))
+    elif type=='csv':
+
+        pmatrix.table.to_csv( path / " ".join([pmatrix.name,".csv"]))
     
     else:
-        
-        t_mat1.to_excel( path / " ".join([pmatrix.name,".xlsx"]))
+
+        pmatrix.table.to_excel( path / " ".join([pmatrix.name,".xlsx"]))
 
     if param is not None:
 
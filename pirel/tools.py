@@ -1,4 +1,4 @@
-from abc import ABC, abstractmethod
+from abc import ABC, ABCMeta, abstractmethod
 
 import numpy as np
 
@@ -8,7 +8,13 @@ from phidl import set_quickplot_options
 
 from phidl import quickplot as qp
 
-import warnings, re, pathlib, gdspy, pdb, functools, inspect
+import warnings, re, pathlib, gdspy, pdb, functools, inspect, hashlib, os, pickle, tempfile, itertools, copyreg
+
+from collections import OrderedDict
+
+from copy import copy
+
+from math import sqrt
 
 import phidl.geometry as pg
 
@@ -18,6 +24,8 @@ import phidl.device_layout as dl
 
 import phidl.path as path
 
+import pirel.rect_tools as rt
+
 from IPython import get_ipython
 
 import matplotlib.pyplot as plt
@@ -31,26 +39,23 @@ if get_ipython() is not None:
 class Point:
     ''' Handles 2-d coordinates.
 
+    Coordinates are rounded to 6 digits when the Point is created.
+
     Arguments
     --------
     x : float
     y : float.
     '''
 
+    __slots__=('x','y')
+
     def __init__(self,*a):
 
         if len(a)==1:
 
             if len(a[0])==2:
 
-                if  (isinstance(a[0][0],int) or isinstance(a[0][0],float)) and (isinstance(a[0][1],int) or isinstance(a[0][1],float) ):
-
-                    self._x=a[0][0]*1.0
-                    self._y=a[0][1]*1.0
-
-                else:
-
-                    raise ValueError("Bad point assignment")
+                x,y=a[0][0],a[0][1]
 
             else:
 
@@ -58,19 +63,18 @@ class Point:
 
         elif len(a)==2:
 
-            if (isinstance(a[0],int) or isinstance(a[0],float)) and (isinstance(a[1],int) or isinstance(a[1],float)):
+            x,y=a
 
-                self._x=a[0]*1.0
-                self._y=a[1]*1.0
-
-            else:
+        else:
 
                 raise ValueError("Bad point assignment")
 
+        if not (isinstance(x,(int,float)) and isinstance(y,(int,float))):
 
-        else:
+            raise ValueError("Bad point assignment")
 
-                raise ValueError("Bad point assignment")
+        _set_x(self,round(float(x),6))
+        _set_y(self,round(float(y),6))
 
     @property
     def coord(self):
@@ -78,15 +82,6 @@ class Point:
 
         return (self.x,self.y)
 
-    @property
-    def x(self):
-
-        return round(self._x,6)
-
-    @property
-    def y(self):
-        return round(self._y,6)
-
     def in_box(self,bbox):
 
         tol=1e-3
@@ -106,46 +101,41 @@ class Point:
 
     def __setattr__(self,name,value):
 
-        if name in ('_x','_y'):
-
-            super().__setattr__(name,value)
+        raise AttributeError("Point is an immutable read-only")
 
-        else:
+    def __reduce__(self):
 
-            raise AttributeError("Point is an immutable read-only")
+        return (Point,(self.x,self.y))
 
     def __add__(self,p):
 
-        if not isinstance(p,Point):
+        if isinstance(p,Point):
+
+            return _new_point(self.x+p.x,self.y+p.y)
 
-            raise Exception(f"cannote add Point to {p}")
+        if isinstance(p,PointArray):
 
-        x1=self.x+p.x
-        y1=self.y+p.y
+            return NotImplemented
 
-        return Point(x1,y1)
+        raise Exception(f"cannote add Point to {p}")
 
     def __sub__(self,p):
 
-        if not isinstance(p,Point):
+        if isinstance(p,Point):
 
-            raise Exception("cannote sub Point to non Point")
+            return _new_point(self.x-p.x,self.y-p.y)
 
-        x1=self.x-p.x
+        if isinstance(p,PointArray):
 
-        y1=self.y-p.y
+            return NotImplemented
 
-        return Point(x1,y1)
+        raise Exception("cannote sub Point to non Point")
 
     def __truediv__(self,x0):
 
-        if isinstance(x0,int) or isinstance(x0,float):
+        if isinstance(x0,(int,float)):
 
-            p=self
-            x1=p.x/x0
-            y1=p.y/x0
-
-            return Point(x1,y1)
+            return _new_point(self.x/x0,self.y/x0)
 
         else:
 
@@ -159,12 +149,9 @@ class Point:
 
     def __mul__(self,x0):
 
-        if isinstance(x0,int) or isinstance(x0,float):
-
-            x1=self.x*x0
-            y1=self.y*x0
+        if isinstance(x0,(int,float)):
 
-            return Point(x1,y1)
+            return _new_point(self.x*x0,self.y*x0)
 
         else:
 
@@ -172,30 +159,24 @@ class Point:
 
     def __eq__(self,p2):
 
-        if not isinstance(p2,Point):
+        if isinstance(p2,Point):
 
-            raise ValueError(f"cannot compare Point and {p2.__class__}")
+            return self.x==p2.x and self.y==p2.y
 
-        else:
-
-            if self.x==p2.x and self.y==p2.y:
-
-                return True
+        if isinstance(p2,PointArray):
 
-            else:
+            return NotImplemented
 
-                return False
+        raise ValueError(f"cannot compare Point and {p2.__class__}")
 
     __rmul__=__mul__
 
     def __hash__(self):
 
-        return hash(self.coord)
+        return hash((self.x,self.y))
 
     def __abs__(self):
 
-        from math import sqrt
-
         return sqrt(self.x**2+self.y**2)
 
     def dot(self,b):
@@ -206,6 +187,214 @@ class Point:
 
         return self.x*b.x+self.y*b.y
 
+_set_x=Point.x.__set__
+
+_set_y=Point.y.__set__
+
+def _new_point(x,y):
+    ''' Point(x,y) for float x,y, skipping input validation.'''
+
+    p=object.__new__(Point)
+
+    _set_x(p,round(float(x),6))
+    _set_y(p,round(float(y),6))
+
+    return p
+
+class PointArray:
+    ''' Handles N 2-d coordinates in a (N,2) numpy array.
+
+    Arithmetic, in_box, dot and rounding follow Point semantics,
+    element by element.
+
+    Arguments
+    --------
+    points : iterable of Point/(x,y), Point or numpy.ndarray of shape (N,2).
+    '''
+
+    __slots__=('_xy',)
+
+    def __init__(self,points=()):
+
+        if isinstance(points,PointArray):
+
+            xy=points._xy
+
+        elif isinstance(points,Point):
+
+            xy=[points.coord]
+
+        elif isinstance(points,np.ndarray):
+
+            xy=points
+
+        else:
+
+            xy=[p.coord if isinstance(p,Point) else p for p in points]
+
+        try:
+
+            xy=np.array(xy,dtype=float)
+
+        except (TypeError,ValueError):
+
+            raise ValueError("Bad point assignment")
+
+        if xy.size==0:
+
+            xy=xy.reshape(0,2)
+
+        if not (xy.ndim==2 and xy.shape[1]==2):
+
+            raise ValueError("Bad point assignment")
+
+        xy=np.round(xy,6)
+
+        xy.flags.writeable=False
+
+        self._xy=xy
+
+    @property
+    def xy(self):
+        ''' returns coordinates in a (N,2) numpy.ndarray '''
+
+        return self._xy
+
+    @property
+    def coord(self):
+        ''' returns coordinates in a list of 2-d tuples'''
+
+        return [tuple(p) for p in self._xy.tolist()]
+
+    @property
+    def x(self):
+
+        return self._xy[:,0]
+
+    @property
+    def y(self):
+
+        return self._xy[:,1]
+
+    @property
+    def centroid(self):
+
+        return Point(*self._xy.sum(axis=0).tolist())/len(self)
+
+    def in_box(self,bbox):
+
+        tol=1e-3
+        ll=Point(bbox[0])+Point(tol,tol)
+        ur=Point(bbox[1])-Point(tol,tol)
+
+        return (self.x>ll.x)&(self.x<ur.x)&(self.y>ll.y)&(self.y<ur.y)
+
+    def __setattr__(self,name,value):
+
+        if name=='_xy' and not hasattr(self,'_xy'):
+
+            super().__setattr__(name,value)
+
+        else:
+
+            raise AttributeError("PointArray is an immutable read-only")
+
+    def __len__(self):
+
+        return len(self._xy)
+
+    def __iter__(self):
+
+        for x,y in self._xy.tolist():
+
+            yield Point(x,y)
+
+    def __getitem__(self,index):
+
+        if isinstance(index,(int,np.integer)):
+
+            return Point(*self._xy[index].tolist())
+
+        return PointArray(self._xy[index])
+
+    def __array__(self,dtype=None,copy=None):
+
+        if dtype is None:
+
+            return self._xy.copy()
+
+        return self._xy.astype(dtype)
+
+    def _other(self,p):
+
+        if isinstance(p,Point):
+
+            return np.array(p.coord)
+
+        elif isinstance(p,PointArray):
+
+            return p._xy
+
+        else:
+
+            raise ValueError(f"cannot operate PointArray with {p.__class__}")
+
+    def __add__(self,p):
+
+        return PointArray(self._xy+self._other(p))
+
+    __radd__ = __add__
+
+    def __sub__(self,p):
+
+        return PointArray(self._xy-self._other(p))
+
+    def __rsub__(self,p):
+
+        return PointArray(self._other(p)-self._xy)
+
+    def _scalar(self,x0):
+
+        if isinstance(x0,(int,float,np.number)):
+
+            return x0
+
+        x0=np.asarray(x0,dtype=float)
+
+        if not x0.shape==(len(self),):
+
+            raise ValueError("PointArray can be scaled by a scalar or by one scalar per point")
+
+        return x0[:,np.newaxis]
+
+    def __mul__(self,x0):
+
+        return PointArray(self._xy*self._scalar(x0))
+
+    __rmul__=__mul__
+
+    def __truediv__(self,x0):
+
+        return PointArray(self._xy/self._scalar(x0))
+
+    def __eq__(self,p2):
+
+        return np.all(self._xy==self._other(p2),axis=1)
+
+    __hash__=None
+
+    def __abs__(self):
+
+        return np.hypot(self.x,self.y)
+
+    def dot(self,b):
+
+        return np.sum(self._xy*self._other(b),axis=1)
+
+    def __repr__(self):
+
+        return "\n".join(f"x={x} y={y}" for x,y in self._xy.tolist())
+
 class LayoutDefault:
     '''container of pirel constants.'''
 
@@ -297,6 +486,11 @@ class LayoutDefault:
     Routingoverhang=20
     Routingside='auto'
 
+    #GridRouting
+
+    GridRoutingobstacles=()
+    GridRoutingspacing=0.0
+
     #MultiRouting
 
     MultiRoutingsources=(Routingports[0],)
@@ -373,9 +567,7 @@ class _LayoutParam:
     @property
     def label(self):
 
-        import re
-
-        return re.sub(r'(?:^|_)([a-z])', lambda x: x.group(1).upper(), self._name)
+        return _get_param_label(self._name)
 
     @property
     def param(self):
@@ -479,6 +671,10 @@ class ReturnIterable():
 
             return _return_iterable(self._value)
 
+_param_reads=None
+
+_param_versions=itertools.count(1)
+
 class LayoutParamInterface:
 
     def __init__(self,allowed_values=None,allowed_types=None):
@@ -514,22 +710,14 @@ class LayoutParamInterface:
 
             setattr(owner,self.private_name,new_param)
 
-            if not hasattr(owner.__class__,'_params_dict'):
-
-                setattr(owner.__class__,'_params_dict',{new_param.label:self.private_name})
-
-            else:
-
-                old_dict=getattr(owner.__class__,'_params_dict')
-
-                if not new_param.label in old_dict:
-
-                    old_dict.update({new_param.label:self.private_name})
+            owner._version=next(_param_versions)
 
         else:
 
             old_param=getattr(owner,self.private_name)
 
+            changed=_hashable(old_param.value)!=_hashable(new_value)
+
             try:
                 old_param.value=new_value
 
@@ -537,6 +725,10 @@ class LayoutParamInterface:
 
                 raise ValueError(f"""Error while assigning {self.public_name} of {owner.__class__.__name__}""") from e
 
+            if changed:
+
+                owner._version=next(_param_versions)
+
     def __get__(self,owner,objtype=None):
 
         if not hasattr(owner,self.private_name):
@@ -545,9 +737,60 @@ class LayoutParamInterface:
 
         else:
 
+            if _param_reads is not None:
+
+                _param_reads[(id(owner),self.private_name)]=owner
+
             return getattr(owner,self.private_name).value
 
-class LayoutPart(ABC) :
+class _LayoutPartMeta(ABCMeta):
+    ''' metaclass of LayoutPart, only there to make its classes picklable (see modifier).'''
+
+def _reduce_layout_class(cls):
+
+    call=cls.__dict__.get('_modifier_call')
+
+    if call is None:
+
+        return cls.__qualname__
+
+    return (_call_modifier,call)
+
+def _call_modifier(modifier,args,kwargs):
+
+    return modifier(*args,**kwargs)
+
+copyreg.pickle(_LayoutPartMeta,_reduce_layout_class)
+
+def modifier(fun):
+    ''' Marks a class decorator so that the classes it returns can be pickled.
+
+    Classes built inside a function are not importable, so pickle can't send them
+    (or their instances) to other processes. The returned class records the call
+    instead, and pickle rebuilds it by calling the decorator again.
+
+    Use:
+        @modifier
+        def addSomething(cls,size=10):
+
+            class WithSomething(cls):
+                ...
+
+            return WithSomething
+    '''
+
+    @functools.wraps(fun)
+    def wrapper(*args,**kwargs):
+
+        cls=fun(*args,**kwargs)
+
+        cls._modifier_call=(wrapper,args,kwargs)
+
+        return cls
+
+    return wrapper
+
+class LayoutPart(ABC,metaclass=_LayoutPartMeta) :
     ''' Abstract class that implements features common to all layout classes.
 
         Attributes
@@ -563,6 +806,20 @@ class LayoutPart(ABC) :
     '''
     name=LayoutParamInterface()
 
+    _params_dict={'Name':'_name'}
+
+    _draw_cached=False
+
+    def __init_subclass__(cls,**kwargs):
+
+        super().__init_subclass__(**kwargs)
+
+        _register_params(cls)
+
+        if 'draw' in cls.__dict__:
+
+            cls.draw=_pirel_cache(cls.__dict__['draw'])
+
     def __init__(self,name='default',*args,**kwargs):
         ''' Constructor for LayoutPart.
 
@@ -573,8 +830,6 @@ class LayoutPart(ABC) :
             optional,default is 'default'.
         '''
 
-        self.__class__._params_dict={}
-
         self.name=name
 
         self._connected=False
@@ -583,6 +838,89 @@ class LayoutPart(ABC) :
 
             setattr(self,p.lower(),cls(name=self.name+p))
 
+    def clone(self):
+        ''' Returns an independent copy of the instance parameter state.
+
+        _LayoutParam objects are copied and components are cloned recursively,
+        while parameter values are shared (they are replaced, never modified,
+        when a parameter is set).
+        Setting parameters on the clone does not affect the original.
+
+        Returns
+        -------
+        part : LayoutPart.
+        '''
+
+        return self._clone({})
+
+    def _clone(self,memo):
+
+        if id(self) in memo:
+
+            return memo[id(self)]
+
+        new=object.__new__(self.__class__)
+
+        memo[id(self)]=new
+
+        for key,value in self.__dict__.items():
+
+            if isinstance(value,_LayoutParam):
+
+                value=copy(value)
+
+            elif isinstance(value,LayoutPart):
+
+                value=value._clone(memo)
+
+            new.__dict__[key]=value
+
+        return new
+
+    def fingerprint(self) -> str:
+        ''' Returns a digest of the parameter state of the instance.
+
+        The digest covers the class (see _get_class_identity), all params and all components params,
+        with Points, Ports, containers and floats converted to a canonical form,
+        so it is stable across instances, runs and processes.
+        Instance names are not included.
+
+        It is recomputed only after a param of the instance,
+        or of its components, is set to a new value.
+
+        Returns
+        -------
+        digest : str
+            32 hex characters (128 bits).
+
+        Raises
+        ------
+        TypeError
+            if a param value has no canonical form (see _canonical).
+        '''
+
+        state=_get_draw_state(self)
+
+        cached=self.__dict__.get('_fingerprint')
+
+        if cached is None or not cached[0]==state:
+
+            digest=hashlib.blake2b(
+                repr(_get_fingerprint_state(self)).encode(),
+                digest_size=16).hexdigest()
+
+            cached=self._fingerprint=(state,digest)
+
+        return cached[1]
+
+    def __getstate__(self):
+
+        state=self.__dict__.copy()
+
+        state.pop('_drawn',None)
+
+        return state
+
     def view(self, gds=False,blocking=True,joined=False,*a,**kw):
         ''' Visualize cell layout with current parameters.
 
@@ -676,98 +1014,122 @@ class LayoutPart(ABC) :
     def get_params(self):
         ''' Returns a dict with param names : param values. '''
 
-        param_dict=self._params_dict
-
         out_dict={}
 
-        for p,c in self.get_components().items():
+        reads=_param_reads
 
-            component_params=getattr(self,p.lower()).get_params()
+        for path,prefix,entries in _get_param_schema(self.__class__).getters:
 
-            for name,value in component_params.items():
+            obj=_get_component(self,path)
 
-                if not name=='Type':
+            if entries is None:
 
-                    out_dict.update({p+name:value})
+                for name,value in obj.get_params().items():
 
-        for param_name in param_dict.values():
+                    if not name=='Type':
 
-            if not hasattr(self,param_name):
+                        out_dict[prefix+name]=value
 
-                raise AttributeError(f" no {param_name} in {self.__class__.__name__}")
+                continue
 
-            else:
+            for param_name,label in entries:
 
-                out_dict.update(getattr(self,param_name).param)
+                param=getattr(obj,param_name,None)
 
-        out_dict.update({"Type":self.__class__.__name__})
+                if param is None:
 
-        return out_dict
+                    raise AttributeError(f" no {param_name} in {obj.__class__.__name__}")
 
-    def _set_params(self,df):
+                if reads is not None:
 
-        for name in self.get_components().keys():
+                    reads[(id(obj),param_name)]=obj
 
-            if_match_import(getattr(self,name.lower()),df,name)
+                value=param.value
 
-        for param_label,param_key in self._params_dict.items():
+                if isinstance(value,Point):
 
-            param_key=param_key.lstrip("_")
+                    out_dict[label+'X']=value.x
 
-            if param_label in df.keys():
+                    out_dict[label+'Y']=value.y
 
-                setattr(self,param_key,df[param_label])
+                else:
 
-            if param_label+'X' in df.keys():
+                    out_dict[label]=value
 
-                old_point=getattr(self,param_key)
+        out_dict["Type"]=self.__class__.__name__
 
-                setattr(self,param_key,Point(df[param_label+"X"],old_point.y))
+        return out_dict
 
-            if param_label+'Y' in df.keys():
+    def _set_params(self,df):
 
-                old_point=getattr(self,param_key)
+        setters=_get_param_schema(self.__class__).setters
 
-                setattr(self,param_key,Point(old_point.x,df[param_label+"Y"]))
+        targets=[]
 
-    def set_params(self,df):
-        ''' Set instance parameters, passed from a dict.
+        for label,value in df.items():
 
-        Parameters
-        ----------
-        df : dict.
+            for target in setters.get(label,()):
 
-            Note: dict value can be a function.
-            In that case, it has to be function of self, so to set the parameter in a dynamic fashion.
+                targets.append((target,value))
 
-        '''
-        stable=False
+        targets.sort(key=lambda t: t[0][0])
+
+        for (_,path,param_name,key),value in targets:
+
+            obj=_get_component(self,path)
+
+            if param_name is None:
+
+                obj._set_params({key:value})
+
+            elif key is None:
+
+                setattr(obj,param_name,value)
+
+            elif key=='X':
+
+                setattr(obj,param_name,Point(value,getattr(obj,param_name).y))
+
+            else:
+
+                setattr(obj,param_name,Point(getattr(obj,param_name).x,value))
+
+    def set_params(self,df):
+        ''' Set instance parameters, passed from a dict.
 
-        while not stable:
+        Parameters
+        ----------
+        df : dict.
 
-            pre_params=self.get_params()
+            Note: dict value can be a function.
+            In that case, it has to be function of self, so to set the parameter in a dynamic fashion.
 
-            df_noncall={key:value for key,value in df.items() if not callable(value)}
+        Functions are evaluated after all the other values are set,
+        ordered by the params they declare with `depends_on` (if any),
+        and the params they read are recorded.
+        Functions are evaluated again only if one of these params changed
+        afterwards, until none does.
+        '''
 
-            self._set_params(df_noncall)
+        self._set_params({key:value for key,value in df.items() if not callable(value)})
 
-            df_call={key:value for key,value in df.items() if callable(value)}
+        df_call={key:value for key,value in df.items() if callable(value)}
 
-            for key,fun in df_call.items():
+        inputs={}
 
-                if fun.__code__.co_argcount==0:
+        order=_sort_callable_params(df_call)
 
-                    df_call[key]=fun()
+        pending=order
 
-                elif fun.__code__.co_argcount==1:
+        while pending:
 
-                    df_call[key]=fun(self)
+            for key in pending:
 
-            self._set_params(df_call)
+                value,inputs[key]=_call_param(df_call[key],self)
 
-            if self.get_params()==pre_params:
+                self._set_params({key:value})
 
-                stable=True
+            pending=[key for key in order if _inputs_changed(inputs[key])]
 
     def export_all(self):
         ''' Exports all cell parameters.
@@ -786,6 +1148,10 @@ class LayoutPart(ABC) :
 
             df["Resistance"]=self.resistance_squares
 
+        if hasattr(self,'active_area'):
+
+            df.update(_LayoutParam('active_area',self.active_area).param)
+
         return df
 
     def export_summary(self):
@@ -844,6 +1210,154 @@ class LayoutPart(ABC) :
 
         self.set_params({key:value})
         
+class _ParamSchema:
+    ''' Flattened parameters of a LayoutPart class.
+
+    Compiled once from the class `_params_dict` and `get_components()`,
+    so that get_params() and _set_params() don't walk the components
+    and match prefixes at every call.
+    Components overriding get_params() or _set_params() are not flattened,
+    and are accessed through their methods.
+
+    Attributes
+    ----------
+    components : tuple of str
+        attributes of the direct components.
+
+    getters : list of (path,prefix,entries)
+        path is the tuple of component attributes leading to the parameters owner,
+        entries are (private name,label) pairs, or None for components
+        with custom methods.
+
+    setters : dict
+        label : list of (order,path,public name,key) targets.
+        key is 'X' or 'Y' for Point coordinates, None for the whole value;
+        for components with custom methods, public name is None
+        and key is the label passed to their _set_params().
+
+    '''
+
+    __slots__=('components','getters','setters')
+
+    def __init__(self,cls):
+
+        self.components=tuple(name.lower() for name in cls.get_components())
+
+        self.getters=[]
+
+        self.setters={}
+
+        self._compile(cls,(),'',[0])
+
+    def _compile(self,cls,path,prefix,order):
+
+        for name,comp in cls.get_components().items():
+
+            comp_path=path+(name.lower(),)
+
+            if comp.get_params is LayoutPart.get_params and \
+                comp._set_params is LayoutPart._set_params:
+
+                self._compile(comp,comp_path,prefix+name,order)
+
+            else:
+
+                comp_schema=_get_param_schema(comp)
+
+                self.getters.append((comp_path,prefix+name,None))
+
+                for label in comp_schema.setters:
+
+                    self._add_setter(prefix+name+label,(order[0],comp_path,None,label))
+
+                order[0]+=1
+
+        entries=[]
+
+        for label,param_name in cls._params_dict.items():
+
+            if not (path and label=='Type'):
+
+                entries.append((param_name,prefix+label))
+
+            for key in (None,'X','Y'):
+
+                self._add_setter(prefix+label+(key or ''),(order[0],path,param_name[1:],key))
+
+                order[0]+=1
+
+        self.getters.append((path,prefix,entries))
+
+    def _add_setter(self,label,target):
+
+        self.setters.setdefault(label,[]).append(target)
+
+def _register_params(cls):
+    ''' Builds the class _params_dict (label : private name).
+
+    Parameters of the base classes come first, then the LayoutParamInterface
+    descriptors defined in the class body, in definition order.
+    '''
+
+    params_dict={}
+
+    for base in reversed(cls.__bases__):
+
+        params_dict.update(getattr(base,'_params_dict',{}))
+
+    for name,value in cls.__dict__.items():
+
+        if isinstance(value,LayoutParamInterface):
+
+            params_dict[_get_param_label(name)]=value.private_name
+
+    cls._params_dict=params_dict
+
+def _get_param_label(name : str) -> str:
+
+    return re.sub(r'(?:^|_)([a-z])', lambda x: x.group(1).upper(), name)
+
+def _get_param_schema(cls) -> _ParamSchema:
+
+    schema=cls.__dict__.get('_param_schema')
+
+    if schema is None:
+
+        schema=_ParamSchema(cls)
+
+        cls._param_schema=schema
+
+    return schema
+
+def _get_draw_state(obj : LayoutPart) -> tuple:
+    ''' Versions of obj and of its components, recursively.
+
+    A version is assigned every time a param of the part changes value,
+    so the state changes when the part or any of its components is modified.
+    Clones share the state of the original until they are modified.
+    '''
+
+    return (obj.__dict__.get('_version'),*(_get_draw_state(getattr(obj,name))
+        for name in _get_param_schema(obj.__class__).components))
+
+def _get_names(obj : LayoutPart) -> tuple:
+    ''' Names of obj and of its components, recursively.
+
+    Cells are named after them, so cached cells are not shared between
+    instances with different names.
+    '''
+
+    return (obj.name,*(_get_names(getattr(obj,name))
+        for name in _get_param_schema(obj.__class__).components))
+
+def _get_component(obj : LayoutPart,path : tuple) -> LayoutPart:
+
+    for name in path:
+
+        obj=getattr(obj,name)
+
+    return obj
+
 def _print_ports(device : Device):
     ''' print a list of ports in the cell.
 
@@ -928,135 +1442,1124 @@ def parallel_res(*args) -> float:
 
     return 1/sum_y
 
-def _pirel_cache(fun):
+def draw_array(
+    cell : Device,
+    x : int, y : int,
+    row_spacing : float = 0 ,
+    column_spacing : float = 0,
+    aref : bool = False,
+    mask = None) -> Device:
+    ''' returns a spaced matrix of identical cells, including ports in the output cell.
 
-    from functools import wraps
+    Ports of the copies are computed from the ports of cell
+    the first time the ports of the output cell are accessed.
 
-    @wraps(fun)
-    def wrapper(self):
+    Parameters
+    ----------
+    cell : phidl.Device
 
-        cls=_get_class_that_defined_method(fun)
+    x : int
+        columns of copies
 
-        params=_get_class_param(cls)
+    y : int
+        rows of copies
 
-        pop_all_match(params,'name')
+    row_spacing: float
 
-        dict_name="_"+fun.__name__+"_lookup"
+    column_spacing: float
 
-        paramhash=_get_hashable_params(self,params)
+    aref : bool (optional, default False)
+        if True, copies are placed as array references (phidl.CellArray),
+        split in rectangular blocks that skip the masked elements
+        (a greedy split, not necessarily the fewest blocks).
+        The output cell is named after its content, so that identical
+        arrays share their name.
 
-        if not hasattr(cls,dict_name):
+    mask : array-like of bool, shape (x,y) (optional)
+        mask[i,j] is False if the copy in column i and row j is left out.
 
-            setattr(cls,dict_name,{})
+    Returns
+    -------
+    cell : phidl.Device.
+    '''
 
-        dict_lookup=getattr(cls,dict_name)
+    new_cell=Device(cell.name+"array")
 
-        if paramhash in dict_lookup.keys():
+    cell_size=Point(cell.size)+Point(column_spacing,row_spacing)
 
-            # print(f"found {cls.__name__} cell")
+    if mask is None:
 
-            return dict_lookup[paramhash]
+        mask=np.ones((x,y),dtype=bool)
 
-        else:
+    else:
 
-            # print(f"build {cls.__name__} cell")
+        mask=np.asarray(mask,dtype=bool).reshape(x,y)
 
-            xout=fun(self)
+    if aref:
 
-            dict_lookup[paramhash]=xout
+        blocks=rt._grid_to_rects(mask,np.arange(x+1),np.arange(y+1)).astype(int)
 
-            return xout
+        for i0,j0,i1,j1 in blocks:
 
-    return wrapper
+            if (i1-i0)*(j1-j0)==1:
 
-def custom_formatwarning(msg, *args, **kwargs):
-    # ignore everything except the message
-    return str(msg) + '\n'
+                ref=new_cell.add_ref(cell)
 
-warnings.formatwarning = custom_formatwarning
+            else:
 
-def _get_class_param(cls : LayoutPart.__class__ ) -> list:
+                ref=new_cell.add_array(cell,columns=i1-i0,rows=j1-j0,spacing=cell_size.coord)
 
-    out_list=[]
+            ref.move(destination=(cell_size.x*i0,cell_size.y*j0))
 
-    if hasattr(cls,'_params_dict'):
+        from pirel.sketch_tools import _get_cell_digest,_max_cellname_length
 
-        for p in cls._params_dict.values():
+        def _digest(c):
 
-                out_list.append(p.lstrip('_'))
+            return _get_cell_digest(c,_digest)
 
-    [out_list.append(x.lower()) for x in cls.get_components()]
+        suffix="_"+_digest(new_cell)[:8]
 
-    return out_list
+        new_cell.name=new_cell.name[:_max_cellname_length-len(suffix)]+suffix
 
-def _get_class_that_defined_method(meth):
-    #from stackoverflow
+    else:
 
-    if isinstance(meth, functools.partial):
+        for i,j,suffix in _iter_array_elements(mask):
 
-        return get_class_that_defined_method(meth.func) # type: ignore
+            ref=new_cell.add_ref(cell,alias=cell.name+suffix)
 
-    if inspect.ismethod(meth) or (inspect.isbuiltin(meth) and getattr(meth, '__self__', None) is not None and getattr(meth.__self__, '__class__', None)):
+            ref.move(destination=(cell_size.x*i,cell_size.y*j))
 
-        for cls in inspect.getmro(meth.__self__.__class__):
+    new_cell.ports=_ArrayPorts(new_cell,dict(cell.ports),mask,cell_size)
 
-            if meth.__name__ in cls.__dict__:
+    return new_cell
 
-                return cls
+def _iter_array_elements(mask):
+    ''' (column, row, name suffix) of the unmasked elements of a draw_array matrix.'''
 
-        meth = getattr(meth, '__func__', meth)  # fallback to __qualname__ parsing
+    x,y=mask.shape
 
-    if inspect.isfunction(meth):
+    for j in range(y):
 
-        cls = getattr(inspect.getmodule(meth),
+        for i in range(x):
 
-                      meth.__qualname__.split('.<locals>', 1)[0].rsplit('.', 1)[0],
+            if not mask[i,j]:
 
-                      None)
+                continue
 
-        if isinstance(cls, type):
+            if y==1 and x==1:
 
-            return cls
+                suffix=''
 
-    return getattr(meth, '__objclass__', None)  # handle special descriptor objects
+            elif y==1:
+
+                suffix='_'+str(i)
+
+            elif x==1:
 
-def _get_hashable_params( obj : LayoutPart , params : list) ->tuple:
+                suffix='_'+str(j)
 
-    paramdict={}
+            else:
+
+                suffix='_'+str(i)+'_'+str(j)
 
-    for name in params:
+            yield i,j,suffix
 
-        value=getattr(obj,name)
+class _ArrayPorts(dict):
+    ''' Ports of a draw_array cell, built from the element ports the first time they are read.
 
-        if isinstance(value, LayoutPart ):
+    Once built it behaves as the plain dict of phidl.Device.ports,
+    and it is pickled and copied as one.
+    '''
 
-            paramdict.update({name:_get_hashable_params(value,_get_class_param(value.__class__))})
+    def __init__(self,device,ports,mask,cell_size):
 
-        elif isinstance(value,tuple):
+        super().__init__()
 
-            if all([isinstance(x,Port) for x in value]):
+        self._pending=(device,ports,mask,cell_size)
 
-                port_list=tuple([(p.name,Point(p.midpoint).coord,p.width,p.orientation) for p in value])
+    def _build(self):
 
-                paramdict.update({name:port_list})
+        if self._pending is None:
 
-            else:
+            return
 
-                paramdict.update({name:value})
+        device,ports,mask,cell_size=self._pending
 
-        elif isinstance(value,list):
+        self._pending=None
 
-            paramdict.update({name:tuple(value)})
+        for i,j,suffix in _iter_array_elements(mask):
 
-        elif isinstance(value, set):
+            offset=Point(cell_size.x*i,cell_size.y*j)
 
-            paramdict.update({name:tuple(sorted(value))})
+            for name,port in ports.items():
+
+                dict.__setitem__(self,name+suffix,Port(
+                    name=name+suffix,
+                    midpoint=(Point(port.midpoint)+offset).coord,
+                    width=port.width,
+                    orientation=port.orientation,
+                    parent=device))
+
+    def __getitem__(self,key):
+
+        self._build()
+
+        return super().__getitem__(key)
+
+    def __setitem__(self,key,value):
+
+        self._build()
+
+        super().__setitem__(key,value)
+
+    def __delitem__(self,key):
+
+        self._build()
+
+        super().__delitem__(key)
+
+    def __contains__(self,key):
+
+        self._build()
+
+        return super().__contains__(key)
+
+    def __iter__(self):
+
+        self._build()
+
+        return super().__iter__()
+
+    def __len__(self):
+
+        self._build()
+
+        return super().__len__()
+
+    def __eq__(self,other):
+
+        self._build()
+
+        return super().__eq__(other)
+
+    def __repr__(self):
+
+        self._build()
+
+        return super().__repr__()
+
+    def keys(self):
+
+        self._build()
+
+        return super().keys()
+
+    def values(self):
+
+        self._build()
+
+        return super().values()
+
+    def items(self):
+
+        self._build()
+
+        return super().items()
+
+    def get(self,*args):
+
+        self._build()
+
+        return super().get(*args)
+
+    def pop(self,*args):
+
+        self._build()
+
+        return super().pop(*args)
+
+    def popitem(self):
+
+        self._build()
+
+        return super().popitem()
+
+    def setdefault(self,*args):
+
+        self._build()
+
+        return super().setdefault(*args)
+
+    def update(self,*args,**kwargs):
+
+        self._build()
+
+        super().update(*args,**kwargs)
+
+    def copy(self):
+
+        self._build()
+
+        return dict(self)
+
+    def __reduce_ex__(self,protocol):
+
+        self._build()
+
+        return (dict,(dict(self),))
+
+class _LRUCache:
+    ''' Bounded mapping that discards the least recently used entries.
+
+    Attributes
+    ----------
+    maxsize : int
+        maximum number of entries stored.
+
+    hits : int
+
+    misses : int
+
+    enabled : bool
+        if False, get() always misses and put() stores nothing.
+    '''
+
+    def __init__(self,maxsize=512):
+
+        self.maxsize=maxsize
+
+        self.enabled=True
+
+        self.hits=0
+
+        self.misses=0
+
+        self._data=OrderedDict()
+
+    def get(self,key,default=None):
+
+        if self.enabled and key in self._data:
+
+            self._data.move_to_end(key)
+
+            self.hits+=1
+
+            return self._data[key]
 
         else:
 
-            paramdict.update({name:value})
+            self.misses+=1
+
+            return default
+
+    def put(self,key,value):
+
+        if not self.enabled:
+
+            return
+
+        self._data[key]=value
+
+        self._data.move_to_end(key)
+
+        while len(self._data)>self.maxsize:
+
+            self._data.popitem(last=False)
+
+    def clear(self):
+
+        self._data.clear()
+
+        self.hits=0
+
+        self.misses=0
+
+    def info(self):
+
+        return {'hits':self.hits,'misses':self.misses,
+            'size':len(self._data),'maxsize':self.maxsize}
+
+    def __contains__(self,key):
+
+        return key in self._data
+
+    def __len__(self):
+
+        return len(self._data)
+
+class _DiskCache:
+    ''' Directory of pickled cells, shared between processes and runs.
+
+    Files are written to a temporary name and atomically renamed,
+    so several processes can share the same directory.
+    When the directory grows beyond max_size, least recently used files are removed.
+
+    Attributes
+    ----------
+    path : pathlib.Path
+
+    max_size : int
+        size cap in bytes.
+    '''
+
+    def __init__(self,path,max_size=2**30):
+
+        import pirel
+
+        self.path=pathlib.Path(path)
+
+        self.path.mkdir(parents=True,exist_ok=True)
+
+        self.max_size=max_size
+
+        self.version=pirel.__version__
+
+        self.hits=0
+
+        self.misses=0
+
+        self.writes=0
+
+        self.evictions=0
+
+        self._size=self._scan_size()
+
+    def _file(self,key):
+
+        fun,cls,digest,names=key
+
+        full_digest=hashlib.blake2b(
+            "/".join([repr(_get_class_identity(cls)),fun.__qualname__,digest,repr(names)]).encode(),
+            digest_size=16).hexdigest()
+
+        cls_name=re.sub(r'[^A-Za-z0-9]+','_',cls.__name__)
+
+        return self.path/f"{cls_name}-{self.version}-{full_digest}.pkl"
+
+    def get(self,key):
+
+        file=self._file(key)
+
+        try:
+
+            with open(file,'rb') as f:
+
+                cell=pickle.load(f)
+
+        except (OSError,EOFError,pickle.UnpicklingError):
+
+            self.misses+=1
+
+            return None
+
+        try:
+
+            os.utime(file)
+
+        except OSError:
+
+            pass
+
+        _renew_uids(cell)
+
+        self.hits+=1
+
+        return cell
+
+    def put(self,key,cell):
+
+        fd,tmp_name=tempfile.mkstemp(dir=self.path,suffix='.tmp')
+
+        file=self._file(key)
+
+        try:
+
+            with os.fdopen(fd,'wb') as f:
+
+                pickle.dump(cell,f,protocol=pickle.HIGHEST_PROTOCOL)
+
+                size=f.tell()
+
+            try:
+
+                self._size-=file.stat().st_size
+
+            except FileNotFoundError:
+
+                pass
+
+            os.replace(tmp_name,file)
+
+        except Exception as e:
+
+            os.remove(tmp_name)
+
+            warnings.warn(f"pirel disk cache: cannot store {cell.name} ({e})")
+
+            return
+
+        self.writes+=1
+
+        self._size+=size
+
+        if self._size>self.max_size:
+
+            self._evict()
+
+    def _scan(self):
+        ''' (mtime,size,file) of the cache files, skipping files removed meanwhile.'''
+
+        files=[]
+
+        for file in self.path.glob('*.pkl'):
+
+            try:
+
+                stat=file.stat()
+
+            except FileNotFoundError:
+
+                continue
+
+            files.append((stat.st_mtime,stat.st_size,file))
+
+        return files
+
+    def _scan_size(self):
+
+        return sum(f[1] for f in self._scan())
+
+    def _evict(self):
+        ''' Removes least recently used files until the directory fits max_size.
+
+        The directory is scanned only here, since other processes may have
+        added or removed files, the size tracked by put() is then resynchronized.
+        '''
+
+        files=self._scan()
+
+        tot_size=sum(f[1] for f in files)
+
+        for mtime,size,file in sorted(files,key=lambda x: x[0]):
+
+            if tot_size<=self.max_size:
+
+                break
+
+            try:
+
+                file.unlink()
+
+                self.evictions+=1
+
+            except FileNotFoundError:
+
+                pass
+
+            except OSError:
+
+                continue
+
+            tot_size-=size
+
+        self._size=tot_size
+
+    def clear(self):
+
+        for file in self.path.glob('*.pkl'):
+
+            try:
+
+                file.unlink()
+
+            except OSError:
+
+                pass
+
+        self._size=self._scan_size()
+
+        self.hits=0
+
+        self.misses=0
+
+        self.writes=0
+
+        self.evictions=0
+
+    def info(self):
+
+        return {'hits':self.hits,'misses':self.misses,
+            'writes':self.writes,'evictions':self.evictions,
+            'size':self._size,
+            'max_size':self.max_size,'path':str(self.path)}
+
+_draw_cache=_LRUCache()
+
+_disk_cache=None
+
+_draw_cache_classes=set()
+
+_registered_caches=[]
+
+def _register_cache(cache : _LRUCache) -> _LRUCache:
+    ''' Ties a module level cache to the draw cache switches.
+
+    The cache is emptied by clear_draw_cache() and by disable_draw_cache(),
+    and stays off after disable_draw_cache() until enable_draw_cache() is called
+    (both without classes).
+    '''
+
+    _registered_caches.append(cache)
+
+    return cache
+
+_draw_cache_generation=0
+
+def enable_draw_cache(*classes,maxsize=None):
+    ''' Reuse cells drawn with identical parameters.
+
+    Cells are looked up by class, by LayoutPart.fingerprint()
+    and by the names of the instance and of its components (cell names follow them),
+    so cached cells are shared between instances and should not be modified after draw().
+
+    Each instance also keeps the cells it last drew, and reuses them
+    without looking them up until one of its params,
+    or of its components params, is set to a new value:
+    params should be replaced, not modified in place.
+
+    Parameters
+    ----------
+    *classes : LayoutPart subclasses (optional)
+        if passed, caching is enabled only for these classes and their subclasses,
+        otherwise it is enabled for every LayoutPart.
+
+    maxsize : int (optional)
+        number of cells kept in memory.
+    '''
+
+    if maxsize is not None:
+
+        _draw_cache.maxsize=maxsize
+
+    if not classes:
+
+        classes=(LayoutPart,)
+
+        for cache in _registered_caches:
+
+            cache.enabled=True
+
+    for cls in classes:
+
+        cls._draw_cached=True
+
+        _draw_cache_classes.add(cls)
+
+def disable_draw_cache(*classes):
+    ''' Disable draw cache.
+
+    Parameters
+    ----------
+    *classes : LayoutPart subclasses (optional)
+        if not passed, caching is disabled for every LayoutPart,
+        and the other registered caches (e.g. GridRouting paths) are emptied and turned off.
+    '''
+
+    if not classes:
+
+        classes=(LayoutPart,*_draw_cache_classes)
+
+        for cache in _registered_caches:
+
+            cache.clear()
+
+            cache.enabled=False
+
+    for cls in classes:
+
+        cls._draw_cached=False
+
+        _draw_cache_classes.discard(cls)
+
+def enable_disk_cache(path=None,max_size=2**30):
+    ''' Persist cells of classes with draw cache enabled in a directory.
+
+    Cells are stored by class name, pirel version and fingerprint,
+    so they are reused across runs and by processes sharing the same path.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path (optional)
+        default is ~/.cache/pirel
+
+    max_size : int (optional)
+        size cap of the directory in bytes.
+    '''
+
+    global _disk_cache
+
+    if path is None:
+
+        path=pathlib.Path.home()/'.cache'/'pirel'
+
+    _disk_cache=_DiskCache(path,max_size)
+
+def disable_disk_cache():
+    ''' Stops reading/writing cells from disk.'''
+
+    global _disk_cache
+
+    _disk_cache=None
+
+def clear_draw_cache(disk=False):
+    ''' Removes all cells from the draw cache, and entries of the other registered caches.
+
+    Parameters
+    ----------
+    disk : boolean
+        if true, cache files on disk are deleted too.
+    '''
+
+    global _draw_cache_generation
+
+    _draw_cache.clear()
+
+    for cache in _registered_caches:
+
+        cache.clear()
+
+    _draw_cache_generation+=1
+
+    if disk and _disk_cache is not None:
+
+        _disk_cache.clear()
+
+def draw_cache_info() -> dict:
+    ''' Returns hits, misses and size of memory and disk draw caches.'''
+
+    if _disk_cache is None:
+
+        disk_info=None
+
+    else:
+
+        disk_info=_disk_cache.info()
+
+    return {'memory':_draw_cache.info(),'disk':disk_info}
+
+def _pirel_cache(fun):
+    ''' wraps LayoutPart.draw methods with the draw cache.
+
+    It is applied automatically to every draw() defined in a LayoutPart subclass.
+    Each instance keeps its last cell, returned as long as neither the instance
+    nor its components changed params (see _get_draw_state),
+    otherwise the cell is looked up by fingerprint and names (see _get_names).
+    Instances whose fingerprint cannot be computed are drawn every time.
+    '''
+
+    from functools import wraps
+
+    @wraps(fun)
+    def wrapper(self,*a,**kw):
+
+        if a or kw or not self._draw_cached:
+
+            return fun(self,*a,**kw)
+
+        drawn=self.__dict__.get('_drawn',{})
+
+        if fun in drawn:
+
+            generation,state,cell=drawn[fun]
+
+            if generation==_draw_cache_generation and state==_get_draw_state(self):
+
+                return cell
+
+        try:
+
+            key=(fun,self.__class__,self.fingerprint(),_get_names(self))
+
+        except TypeError:
+
+            # params without a canonical form, drawn without the shared caches
+
+            cell=fun(self)
+
+        else:
+
+            cell=_draw_cache.get(key)
+
+            if cell is None:
+
+                if _disk_cache is not None:
+
+                    cell=_disk_cache.get(key)
+
+                if cell is None:
+
+                    cell=fun(self)
+
+                    if _disk_cache is not None:
+
+                        _disk_cache.put(key,cell)
+
+                _draw_cache.put(key,cell)
+
+        self._drawn={**drawn,fun:(_draw_cache_generation,_get_draw_state(self),cell)}
+
+        return cell
+
+    return wrapper
+
+def _renew_uids(cell : Device):
+    ''' assigns new uids to a cell (and its dependencies) created in another process.'''
+
+    for c in [cell,*cell.get_dependencies(recursive=True)]:
+
+        c.uid=Device._next_uid
+
+        Device._next_uid+=1
+
+def _get_class_identity(cls) -> str:
+    ''' Stable digest identifying a LayoutPart class, across runs and processes.
+
+    Classes returned by decorators (e.g. addPad) share name and qualname
+    for any decorator argument, so the values captured by the closures of their methods
+    are included, together with the identity of their bases.
+    '''
+
+    identity=cls.__dict__.get('_class_identity')
+
+    if identity is None:
+
+        # placeholder, in case methods refer back to the class
+
+        cls._class_identity=".".join([cls.__module__,cls.__qualname__])
+
+        try:
+
+            bases=tuple(_get_class_identity(base) if issubclass(base,LayoutPart) \
+                else ".".join([base.__module__,base.__qualname__]) for base in cls.__bases__)
+
+            closures=[]
+
+            for name,value in cls.__dict__.items():
+
+                if isinstance(value,(staticmethod,classmethod,property)) or inspect.isfunction(value):
+
+                    closure=_get_closure_identity(value,set())
+
+                    if any(closure):
+
+                        closures.append((name,closure))
+
+        except Exception:
+
+            del cls._class_identity
+
+            raise
+
+        identity=cls._class_identity=hashlib.blake2b(
+            repr((cls.__module__,cls.__qualname__,cls.__name__,bases,closures)).encode(),
+            digest_size=16).hexdigest()
+
+    return identity
+
+def _get_closure_identity(value,seen : set):
+    ''' Canonical form of the values captured by a method closure (empty tuple if none).'''
+
+    if isinstance(value,(staticmethod,classmethod)):
+
+        return _get_closure_identity(value.__func__,seen)
+
+    elif isinstance(value,property):
+
+        return tuple(_get_closure_identity(f,seen) for f in (value.fget,value.fset,value.fdel) if f is not None)
+
+    elif id(value) in seen:
+
+        return ()
+
+    seen.add(id(value))
+
+    cells=[]
+
+    for name,cell in zip(value.__code__.co_freevars,value.__closure__ or ()):
+
+        if name=='__class__':
+
+            continue
+
+        try:
+
+            contents=cell.cell_contents
+
+        except ValueError:
+
+            continue
+
+        if inspect.isfunction(contents):
+
+            contents=(contents.__module__,contents.__qualname__,_get_closure_identity(contents,seen))
+
+        else:
+
+            contents=_canonical(contents)
+
+        cells.append((name,contents))
+
+    return tuple(cells)
+
+def _get_fingerprint_state(obj : LayoutPart) -> tuple:
+    ''' Canonical tuple of class identity, params and components of obj, names excluded.'''
+
+    schema=_get_param_schema(obj.__class__)
+
+    params=tuple((label,_canonical(getattr(obj,param_name).value))
+        for label,param_name in obj._params_dict.items() if not label=='Name')
+
+    components=tuple((name,_get_fingerprint_state(getattr(obj,name)))
+        for name in schema.components)
+
+    return (_get_class_identity(obj.__class__),params,components)
+
+def _canonical(value):
+    ''' Representation of value used by fingerprints.
+
+    Numbers are converted to floats rounded to 1e-9 (so that 1, 1.0, np.float64(1)
+    and -0.0/0.0 match), containers to tuples (sets and dicts sorted),
+    classes to their qualified name (LayoutPart classes to _get_class_identity()).
+
+    Raises
+    ------
+        TypeError
+            if value has no representation that is stable across processes.
+    '''
+
+    if isinstance(value,(bool,np.bool_)) or value is None or isinstance(value,str):
+
+        return value
+
+    elif isinstance(value,(int,float,np.integer,np.floating)):
+
+        return round(float(value),9)+0.0
+
+    elif isinstance(value,Port):
+
+        return ('Port',value.name,_canonical(Point(value.midpoint).coord),
+            _canonical(value.width),_canonical(value.orientation))
+
+    elif isinstance(value,Point):
+
+        return ('Point',_canonical(value.x),_canonical(value.y))
+
+    elif isinstance(value,LayoutPart):
+
+        return ('LayoutPart',_get_fingerprint_state(value))
+
+    elif isinstance(value,(set,frozenset)):
+
+        return tuple(sorted((_canonical(x) for x in value),key=repr))
+
+    elif isinstance(value,(list,tuple)):
+
+        return tuple(_canonical(x) for x in value)
+
+    elif isinstance(value,np.ndarray):
+
+        return _canonical(value.tolist())
+
+    elif isinstance(value,dict):
+
+        return tuple(sorted(((_canonical(k),_canonical(v)) for k,v in value.items()),key=repr))
+
+    elif inspect.isclass(value):
+
+        if issubclass(value,LayoutPart):
+
+            return ('LayoutPartClass',_get_class_identity(value))
+
+        return ('Class',".".join([value.__module__,value.__qualname__]))
+
+    else:
+
+        raise TypeError(f"{type(value).__name__} values have no canonical form for fingerprints")
+
+def _hashable(value):
+
+    if isinstance(value,Port):
+
+        return ('Port',value.name,Point(value.midpoint).coord,value.width,value.orientation)
+
+    elif isinstance(value,Point):
+
+        return value.coord
+
+    elif isinstance(value,(set,frozenset)):
+
+        return tuple(sorted((_hashable(x) for x in value),key=repr))
+
+    elif isinstance(value,(list,tuple)):
+
+        return tuple(_hashable(x) for x in value)
+
+    elif isinstance(value,np.ndarray):
+
+        return tuple(value.tolist())
+
+    elif isinstance(value,dict):
+
+        return tuple((k,_hashable(v)) for k,v in value.items())
+
+    else:
+
+        return value
+
+def custom_formatwarning(msg, *args, **kwargs):
+    # ignore everything except the message
+    return str(msg) + '\n'
+
+warnings.formatwarning = custom_formatwarning
+
+def _get_class_that_defined_method(meth):
+    #from stackoverflow
+
+    if isinstance(meth, functools.partial):
+
+        return get_class_that_defined_method(meth.func) # type: ignore
+
+    if inspect.ismethod(meth) or (inspect.isbuiltin(meth) and getattr(meth, '__self__', None) is not None and getattr(meth.__self__, '__class__', None)):
+
+        for cls in inspect.getmro(meth.__self__.__class__):
+
+            if meth.__name__ in cls.__dict__:
+
+                return cls
+
+        meth = getattr(meth, '__func__', meth)  # fallback to __qualname__ parsing
+
+    if inspect.isfunction(meth):
+
+        cls = getattr(inspect.getmodule(meth),
+
+                      meth.__qualname__.split('.<locals>', 1)[0].rsplit('.', 1)[0],
+
+                      None)
+
+        if isinstance(cls, type):
+
+            return cls
+
+    return getattr(meth, '__objclass__', None)  # handle special descriptor objects
+
+def depends_on(*labels):
+    ''' Declares the params read by a function passed to set_params().
+
+    set_params() evaluates the function after the ones setting these params.
+
+    Parameters
+    ----------
+    labels : str
+        param names, as in get_params().
+
+    Use:
+        part.set_params({
+            "AnchorSizeX":depends_on("IDTPitch")(lambda x: x.idt.pitch*3),
+            "IDTPitch":lambda x: x.idt.n*2})
+    '''
+
+    def decorator(fun):
+
+        fun.depends_on=labels
+
+        return fun
+
+    return decorator
+
+def _sort_callable_params(df_call : dict) -> list:
+    ''' Keys of df_call, each after the keys its function depends_on.
+
+    Circular dependencies are left in dict order.
+    '''
+
+    out=[]
+
+    visiting=set()
+
+    def visit(key):
+
+        if key in out or key in visiting:
+
+            return
+
+        visiting.add(key)
+
+        for label in getattr(df_call[key],'depends_on',()):
+
+            for dep in (label,label+'X',label+'Y'):
+
+                if dep in df_call:
+
+                    visit(dep)
+
+        visiting.discard(key)
+
+        out.append(key)
+
+    for key in df_call:
+
+        visit(key)
+
+    return out
+
+def _call_param(fun,obj : LayoutPart):
+    ''' Evaluates a callable param of obj.
+
+    Returns
+    -------
+    value
+
+    inputs : list of (owner,private name,value)
+        params read by fun, with their values after the call.
+    '''
+
+    global _param_reads
+
+    outer_reads=_param_reads
+
+    _param_reads=reads={}
+
+    try:
+
+        if fun.__code__.co_argcount==0:
+
+            value=fun()
+
+        elif fun.__code__.co_argcount==1:
+
+            value=fun(obj)
+
+        else:
+
+            value=fun
+
+    finally:
+
+        _param_reads=outer_reads
+
+    if outer_reads is not None:
+
+        outer_reads.update(reads)
+
+    inputs=[(owner,name,_hashable(getattr(owner,name).value))
+        for (_,name),owner in reads.items()]
+
+    return value,inputs
+
+def _inputs_changed(inputs : list) -> bool:
 
-    return tuple(paramdict.items())
+    return any(_hashable(getattr(owner,name).value)!=value for owner,name,value in inputs)
 
 def pick_callable_param(pars : dict):
 
@@ -0,0 +1,45 @@
+import pirel.pcells as pc
+import pirel.modifiers as pm
+import pirel.tools as pt
+import numpy as np
+import pickle
+
+via=pc.Via().draw()
+
+mask=np.ones((40,30),dtype=bool)
+
+mask[10:20,5:25]=False
+
+array=pt.draw_array(via,40,30,row_spacing=10,column_spacing=10,aref=True,mask=mask)
+
+# ports are built only when read
+
+assert array.ports._pending is not None
+
+assert len(array.ports)==mask.sum()*len(via.ports)
+
+assert array.ports._pending is None
+
+port=array.ports['conn_39_29']
+
+assert np.allclose(port.midpoint,np.array(via.ports['conn'].midpoint)+[39*30,29*30])
+
+assert port.parent is array
+
+assert pickle.loads(pickle.dumps(array)).ports.keys()==array.ports.keys()
+
+# identical arrays share their name, different ones do not
+
+same=pt.draw_array(via,40,30,row_spacing=10,column_spacing=10,aref=True,mask=mask)
+
+other=pt.draw_array(via,40,30,row_spacing=10,column_spacing=10,aref=True)
+
+assert same.name==array.name and not other.name==array.name
+
+device=pm.addGroundVias(pm.addOnePortProbe(pm.makeArray(pc.LFERes,3)))()
+
+names=[c.name for c in device.draw().get_dependencies(recursive=True) if 'GndViaarray' in c.name]
+
+print(f"ground via array cells : {names}")
+
+assert len(names)==len(set(names))
@@ -0,0 +1,188 @@
+import pirel.pcells as pc
+import pirel.modifiers as pm
+import pirel.tools as pt
+import phidl.geometry as pg
+import phidl.device_layout as dl
+import time, tempfile
+
+device=pm.makeScaled(pc.FBERes)()
+
+fingerprint=device.fingerprint()
+
+assert device.clone().fingerprint()==fingerprint
+
+assert pm.makeScaled(pc.FBERes)(name='other').fingerprint()==fingerprint
+
+assert pc.FBERes().fingerprint()!=fingerprint
+
+device.idt.n=device.idt.n+1
+
+assert device.fingerprint()!=fingerprint
+
+device.idt.n=device.idt.n-1
+
+assert device.fingerprint()==fingerprint
+
+other=device.clone()
+
+other.idt.n=float(other.idt.n)
+
+assert other.fingerprint()==fingerprint
+
+# decorated classes share their name, but not their fingerprint
+
+assert pm.addPad(pc.LFERes,side='top')().fingerprint()!=pm.addPad(pc.LFERes,side='bottom')().fingerprint()
+
+# params without a canonical form are not fingerprinted, and drawn uncached
+
+try:
+
+    pt._canonical(object())
+
+except TypeError:
+
+    pass
+
+else:
+
+    raise AssertionError("_canonical accepted an object without a canonical form")
+
+print(f"fingerprint : {fingerprint}")
+
+start=time.time()
+
+for i in range(10):
+
+    device.draw()
+
+print(f"no cache : {time.time()-start:.3f} s")
+
+pt.enable_draw_cache()
+
+start=time.time()
+
+for i in range(10):
+
+    device.draw()
+
+print(f"cache : {time.time()-start:.3f} s")
+
+print(pt.draw_cache_info())
+
+assert device.draw() is device.draw()
+
+device.idt.n=8
+
+assert pt.draw_cache_info()['memory']['size']>0
+
+device.draw()
+
+anchor_cell=device.anchor.draw()
+
+device.idt.y_offset=device.idt.y_offset*2
+
+device.draw()
+
+assert device.anchor.draw() is anchor_cell
+
+device.anchor.size=pt.Point(device.anchor.size.x+1,device.anchor.size.y)
+
+assert device.anchor.draw() is not anchor_cell
+
+assert device.clone().draw() is device.draw()
+
+# instances differing only by name get cells named after them
+
+named=device.clone()
+
+named.name='named'
+
+assert named.fingerprint()==device.fingerprint()
+
+assert named.draw().name=='named' and not device.draw().name=='named'
+
+assert pc.LFERes(name='otherLFE').draw().name=='otherLFE'
+
+pt.enable_disk_cache(tempfile.mkdtemp())
+
+pt.clear_draw_cache()
+
+device.draw()
+
+pt.clear_draw_cache()
+
+device.draw()
+
+print(pt.draw_cache_info()['disk'])
+
+# decorated classes differing only by decorator arguments
+
+top_pad=pm.addPad(pc.LFERes,side='top')()
+
+bottom_pad=pm.addPad(pc.LFERes,side='bottom')()
+
+top_bbox=top_pad.draw().bbox.tolist()
+
+pt.clear_draw_cache()
+
+assert bottom_pad.draw().bbox.tolist()!=top_bbox
+
+pt.enable_disk_cache(tempfile.mkdtemp(),max_size=50000)
+
+for n in range(4,12):
+
+    device.idt.n=n
+
+    device.draw()
+
+disk_info=pt.draw_cache_info()['disk']
+
+assert disk_info['evictions']>0 and disk_info['size']<=50000
+
+print(disk_info)
+
+pt.disable_disk_cache()
+
+route=pc.GridRouting()
+
+route.obstacles=(pg.rectangle((10,10)).move((500,500)),)
+
+assert route.draw() is route.draw()
+
+# Routing paths cache follows the draw cache switches
+
+route=pc.Routing()
+
+route.source=dl.Port(name='source',midpoint=(200,0),width=50,orientation=90)
+
+route.destination=dl.Port(name='destination',midpoint=(200,800),width=50,orientation=0)
+
+route.clearance=((0,100),(400,600))
+
+route.draw()
+
+assert pc._routing_cache.info()['size']>0
+
+pt.clear_draw_cache()
+
+assert pc._routing_cache.info()['size']==0
+
+route.draw()
+
+pt.disable_draw_cache()
+
+assert pc._routing_cache.info()['size']==0
+
+route.draw()
+
+assert pc._routing_cache.info()['size']==0
+
+pt.enable_draw_cache()
+
+pt.clear_draw_cache()
+
+route.draw()
+
+assert pc._routing_cache.info()['size']>0
+
+pt.disable_draw_cache()
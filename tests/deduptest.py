@@ -0,0 +1,41 @@
+import pirel.pcells as pc
+import pirel.modifiers as pm
+import pirel.sweeps as ps
+import pirel.sketch_tools as st
+import gdspy
+import os
+import tempfile
+
+device=pm.addOnePortProbe(pm.makeArray(pm.makeScaled(pc.LFERes),4))()
+
+device.anchor.n=1
+
+device.set_params({"AnchorSizeY":2})
+
+array=ps.PArray(device,x_param=ps.SweepParam({'IDTN':[2,2,4,4]}))
+
+array.hierarchical=True
+
+folder=tempfile.mkdtemp()
+
+sizes={}
+
+for dedup in (False,True):
+
+    path=os.path.join(folder,f"dedup_{dedup}.gds")
+
+    st.write_gds(array.draw(),path,dedup=dedup)
+
+    sizes[dedup]=os.path.getsize(path)
+
+print(f"GDS size : {sizes[False]} bytes, deduplicated {sizes[True]} bytes")
+
+assert sizes[True]<sizes[False]
+
+full=gdspy.GdsLibrary(infile=os.path.join(folder,"dedup_False.gds")).top_level()[0].get_polygons(by_spec=True)
+
+dedup=gdspy.GdsLibrary(infile=os.path.join(folder,"dedup_True.gds")).top_level()[0].get_polygons(by_spec=True)
+
+for layer in full:
+
+    assert gdspy.boolean(full[layer],dedup[layer],'xor',precision=1e-4) is None
@@ -0,0 +1,37 @@
+import pirel.pcells as pc
+import pirel.modifiers as pm
+import pirel.sweeps as ps
+import pathlib
+import tempfile
+
+def export(array,stream):
+
+    path=pathlib.Path(tempfile.mkdtemp())
+
+    ps.export_matrix_data(array,path=path,stream=stream)
+
+    return (path/" ".join([array.name,".csv"])).read_text()
+
+for device in (pc.TFERes(),pm.addPad(pc.LFERes)()):
+
+    arr=ps.PArray(device,ps.SweepParam({"IDTN":[3,5,7]}))
+
+    mat=ps.PMatrix(device,
+        ps.SweepParam({"IDTN":[3,5]}),
+        ps.SweepParam({"IDTPitch":[10,15,20]}))
+
+    for array in (arr,mat):
+
+        array.auto_labels()
+
+        eager=export(array,False)
+
+        streamed=export(array,True)
+
+        print(f"{device.__class__.__name__} {array.__class__.__name__} : {len(eager.splitlines())} lines")
+
+        assert streamed==eager,(streamed,eager)
+
+ps._table_block_size=2
+
+assert export(mat,True)==export(mat,False)
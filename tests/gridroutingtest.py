@@ -0,0 +1,92 @@
+import phidl.device_layout as dl
+import pirel.pcells as pc
+import pirel.modifiers as pm
+import time
+
+route=pc.GridRouting()
+
+route.source=dl.Port(
+    name='source',
+    midpoint=(200,0),
+    width=50,
+    orientation=90)
+
+route.destination=dl.Port(
+    name='destination',
+    midpoint=(200,800),
+    width=50,
+    orientation=0)
+
+route.trace_width=20
+
+route.clearance=((0,100),(400,600))
+
+route.obstacles=(((-200,300),(-10,320)),((420,650),(600,700)))
+
+route.overhang=50
+
+start=time.time()
+
+cell=route.draw()
+
+print(f"GridRouting : {time.time()-start:.3f} s, bbox {cell.bbox.tolist()}")
+
+assert cell.xmax<=420
+
+# source facing away from destination, and source facing the clearance
+# closer than spacing: the stub stops before the clearance and the trace goes around
+
+route.overhang=None
+
+route.obstacles=()
+
+route.spacing=50
+
+for y,orientation in ((-100,270),(50,90)):
+
+    route.source=dl.Port(
+        name='source',
+        midpoint=(200,y),
+        width=50,
+        orientation=orientation)
+
+    cell=route.draw()
+
+    print(f"GridRouting from {orientation} deg : bbox {cell.bbox.tolist()}")
+
+    assert not route._is_blocked(
+        route._make_path(route.source,route.destination).points,
+        route.trace_width,
+        route._get_obstacle_boxes())
+
+device=pm.addOnePortProbe(pm.makeArray(pm.makeScaled(pc.FBERes),4))()
+
+device.anchor.n=1
+
+device.set_params({"AnchorSizeY":2})
+
+device.n_blocks=2
+
+start=time.time()
+
+device.draw()
+
+print(f"probed device : {time.time()-start:.3f} s")
+
+# narrow arrays: probe ground ports closer to the clearance than half the trace width
+
+for cls in (pc.LFERes,pc.TFERes):
+
+    for n_idt in (2,3):
+
+        for n_blocks in (3,4):
+
+            device=pm.addOnePortProbe(pm.makeArray(cls,n_blocks))()
+
+            device.idt.n=n_idt
+
+            device.idt.pitch=10
+
+            cell=device.draw()
+
+            print(f"{cls.__name__} x {n_blocks}, IDTN {n_idt} : bbox {cell.bbox.tolist()}")
@@ -0,0 +1,69 @@
+import pirel.pcells as pc
+import pirel.sweeps as ps
+import pirel.sketch_tools as st
+import phidl.geometry as pg
+from phidl.device_layout import Device
+
+def xor_area(a,b):
+
+    return pg.xor_diff(a,b,precision=1e-3).area()
+
+def joined_with_ref(lazy):
+
+    cell=Device()
+
+    cell<<pg.rectangle((10,10))
+
+    cell<<pg.rectangle((10,10)).move((5,5))
+
+    cell=st.join(cell,lazy=lazy)
+
+    cell<<pg.rectangle((4,1)).move((30,30))
+
+    return cell
+
+eager=joined_with_ref(False)
+
+lazy=joined_with_ref(True)
+
+print(f"join then add reference : eager area {eager.area()}, lazy area {lazy.area()}")
+
+assert abs(eager.area()-lazy.area())<1e-6
+
+assert xor_area(eager,lazy)<1e-6
+
+def draw_array(lazy):
+
+    if lazy:
+
+        st.enable_lazy_join()
+
+    try:
+
+        arr=ps.PArray(pc.LFERes(),ps.SweepParam({"IDTN":[3,5,7]}))
+
+        arr.auto_labels()
+
+        return arr.draw()
+
+    finally:
+
+        st.disable_lazy_join()
+
+eager=draw_array(False)
+
+lazy=draw_array(True)
+
+eager_areas=eager.area(by_spec=True)
+
+lazy_areas=lazy.area(by_spec=True)
+
+xor_areas=pg.xor_diff(eager,lazy,precision=1e-3).area(by_spec=True)
+
+for layer,area in eager_areas.items():
+
+    print(f"PArray layer {layer} : eager area {area}, lazy area {lazy_areas[layer]}")
+
+    assert abs(area-lazy_areas[layer])<1e-6
+
+    assert xor_areas.get(layer,0)<1e-6
@@ -0,0 +1,46 @@
+import pirel.pcells as pc
+import pirel.modifiers as pm
+import pirel.sweeps as ps
+import numpy as np
+import time
+import warnings
+
+def polygons(cell):
+
+    return {layer:sorted(np.round(p,3).tolist() for p in polys) \
+        for layer,polys in cell.get_polygons(by_spec=True).items()}
+
+if __name__=='__main__':
+
+    for device in (
+        pc.TFERes(),
+        pm.addPad(pc.LFERes)(),
+        pm.addOnePortProbe(pm.makeArray(pc.LFERes,2),pc.GSGProbe)()):
+
+        arr=ps.PMatrix(device,
+            ps.SweepParam({"IDTN":[3,5,7,9]}),
+            ps.SweepParam({"IDTPitch":[10,15,20]}))
+
+        arr.auto_labels()
+
+        results=[]
+
+        for workers,start_method in ((1,None),(4,None),(4,'spawn')):
+
+            arr.workers=workers
+
+            arr.start_method=start_method
+
+            start=time.time()
+
+            with warnings.catch_warnings():
+
+                warnings.filterwarnings("error",message=".*drawn serially")
+
+                cell=arr.draw()
+
+            print(f"workers : {workers} ({start_method}) , {time.time()-start:.3f} s , bbox {cell.bbox.tolist()}")
+
+            results.append((polygons(cell),arr.table.astype(str).to_dict()))
+
+        assert all(r==results[0] for r in results[1:])
@@ -0,0 +1,49 @@
+import phidl.device_layout as dl
+import pirel.pcells as pc
+import pirel.tools as pt
+import pirel.sketch_tools as st
+import timeit
+
+n=20000
+
+def points():
+
+    p=pt.Point(10.1234567,20)
+
+    q=pt.Point((5,3.5))
+
+    return abs((p+q)*2-q/3)+p.dot(q)
+
+print(f"Point arithmetic : {timeit.timeit(points,number=n)/n*1e6:.2f} us")
+
+route=pc.Routing()
+
+route.source=dl.Port(name='source',midpoint=(200,0),width=50,orientation=90)
+
+route.destination=dl.Port(name='destination',midpoint=(200,800),width=50,orientation=0)
+
+route.trace_width=20
+
+route.clearance=((0,100),(400,600))
+
+route.overhang=50
+
+route.side='right'
+
+cell=route.draw()
+
+n=2000
+
+print(f"get_corners : {timeit.timeit(lambda: st.get_corners(cell),number=n)/n*1e6:.2f} us")
+
+n=50
+
+print(f"Routing.draw : {timeit.timeit(route.draw,number=n)/n*1e3:.2f} ms")
+
+lfe=pc.LFERes()
+
+n=500
+
+print(f"LFERes.get_params : {timeit.timeit(lfe.get_params,number=n)/n*1e6:.2f} us")
+
+print(f"LFERes.set_params : {timeit.timeit(lambda: lfe.set_params({'IDTPitch':7,'AnchorSizeX':5}),number=n)/n*1e6:.2f} us")
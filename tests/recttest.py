@@ -0,0 +1,59 @@
+import pirel.rect_tools as rt
+import pirel.pcells as pc
+import phidl.geometry as pg
+import numpy as np
+import gdspy
+import time
+
+rng=np.random.default_rng(0)
+
+corners=np.round(rng.uniform(0,100,(300,2)),2)
+
+rects=np.hstack((corners,corners+np.round(rng.uniform(1,10,(300,2)),2)))
+
+rectset=rt.RectSet(rects,layer=1)
+
+reference=gdspy.boolean([gdspy.Rectangle(r[:2],r[2:]) for r in rects],None,'or')
+
+assert abs(rectset.area()-reference.area())<1e-6
+
+hole=rt.RectSet([[20,20,80,80]],layer=1)
+
+assert abs((rectset-hole).area()+(rectset&hole).area()-rectset.area())<1e-6
+
+idt=pc.IDT()
+
+idt.n=200
+
+start=time.time()
+
+cell=idt.draw()
+
+print(f"IDT n=200 : {time.time()-start:.3f} s, {len(cell.polygons)} polygons")
+
+assert abs(cell.area()-pg.union(cell).area())<1e-6
+
+boxes=np.array([[0,0,1,1],[1,1,2,2],[5.5,5.5,6.5,6.5]])
+
+covered=rt.RectSet([[0,0,2,1],[0,1,1,2],[1,1,3,3],[5,5,6,6]],layer=1).covers(boxes)
+
+assert covered.tolist()==[True,True,False]
+
+# st.join of scattered, non aligned rectangles: no dense grid of all the edges
+
+import pirel.sketch_tools as st
+from phidl.device_layout import Device
+
+device=Device()
+
+for x,y in rng.uniform(0,10000,(3000,2)):
+
+    device.add_polygon([(x,y),(x+20,y),(x+20,y+7),(x,y+7)])
+
+start=time.time()
+
+joined=st.join(device)
+
+print(f"join of 3000 scattered rectangles : {time.time()-start:.3f} s, {len(joined.polygons)} polygons")
+
+assert len(joined.polygons)==len(pg.union(device,by_layer=True,precision=0.001,join_first=False).polygons)
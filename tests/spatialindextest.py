@@ -0,0 +1,71 @@
+import pirel.sketch_tools as st
+import phidl.geometry as pg
+from phidl.device_layout import Device
+import numpy as np
+import time
+
+def brute_force(index,bbox):
+
+    (x0,y0),(x1,y1)=bbox
+
+    b=index.bboxes
+
+    return np.flatnonzero((b[:,0]<=x1)&(b[:,2]>=x0)&(b[:,1]<=y1)&(b[:,3]>=y0))
+
+# queries much larger than the indexed polygons, and the other way around
+
+for ref_size,test_bbox in (
+    ((1,1),((0,0),(3000,3000))),
+    ((10,10),((-10000,-5),(10000,5))),
+    ((3000,3000),((0,0),(1,1))),
+    ((10,10),((5000,5000),(5001,5001)))):
+
+    ref=Device()
+
+    ref<<pg.rectangle(ref_size)
+
+    start=time.time()
+
+    index=st.SpatialIndex(ref)
+
+    found=index.query(test_bbox)
+
+    overlap=index.overlap_area(test_bbox)
+
+    duration=time.time()-start
+
+    print(f"ref {ref_size} vs {test_bbox} : {duration:.4f} s")
+
+    assert duration<0.1
+
+    assert found.tolist()==brute_force(index,test_bbox).tolist()
+
+    (x0,y0),(x1,y1)=test_bbox
+
+    expected=max(min(x1,ref_size[0])-max(x0,0),0)*max(min(y1,ref_size[1])-max(y0,0),0)
+
+    assert abs(overlap-expected)<1e-6
+
+# many small polygons and a large one in the same index
+
+rng=np.random.default_rng(0)
+
+ref=Device()
+
+ref<<pg.rectangle((5000,5000)).move((-6000,0))
+
+for x,y in rng.uniform(0,1000,(500,2)):
+
+    ref<<pg.rectangle((1,1)).move((x,y))
+
+index=st.SpatialIndex(ref)
+
+for bbox in rng.uniform(-8000,8000,(50,2,2)):
+
+    bbox=np.sort(bbox,axis=0)
+
+    assert index.query(bbox).tolist()==brute_force(index,bbox).tolist()
+
+empty=st.SpatialIndex(Device())
+
+assert not len(empty.query(((0,0),(1e6,1e6))))
@@ -0,0 +1,25 @@
+import pirel.pcells as pc
+import pirel.modifiers as pm
+import pirel.sketch_tools as st
+import phidl.geometry as pg
+import numpy as np
+
+# every ground via lies on ground metal, none on the etch layer only
+
+device=pm.addGroundVias(pm.addOnePortProbe(pm.makeArray(pc.LFERes,3),pc.GSGProbe))()
+
+cell=pg.deepcopy(device.draw())
+
+cell.flatten()
+
+polygons=cell.get_polygons(by_spec=True)
+
+vias=polygons[(device.gndvia.layer,0)]
+
+boxes=np.array([[*p.min(axis=0),*p.max(axis=0)] for p in vias])
+
+inside=st.are_boxes_inside(boxes,cell,0,device.probe.ground_layer)
+
+print(f"{len(boxes)} ground vias, {np.sum(~inside)} outside ground metal")
+
+assert inside.all()